@@ -1,42 +1,46 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, redirect
+from flask import Flask, request, jsonify, send_from_directory, redirect
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_limiter.errors import RateLimitExceeded
 from werkzeug.middleware.proxy_fix import ProxyFix
+from .helpers.replica import RoutingSession
 import redis
-import jwt
+import hmac
 import os
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
 
 
 def create_app():
     from .config import Config
+    from .helpers.jwks import apple_keys
+    from .helpers.utils import get_auth_context
+    from .helpers.metrics import init_metrics, metrics_response, RATE_LIMITED
+    from .helpers.serialize import init_json
+    from .helpers.assets import assets
 
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_json(app)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
 
     CORS(app)
     db.init_app(app)
+    migrate.init_app(app, db, directory=os.path.join(
+        os.path.dirname(app.root_path), 'migrations'))
 
     def get_user_or_ip():
-        token = request.headers.get('Authorization', None)
-        if token and token.startswith("Bearer "):
-            token = token.split(" ")[1]
-            try:
-                user_id = jwt.decode(token, Config.SECRET_KEY, algorithms=[
-                                     'HS256'])['user_id']
-                return user_id
-            except:
-                pass
-        return get_remote_address()
+        _, user_id = get_auth_context()
+        return user_id or get_remote_address()
 
     strategy = "fixed-window"
     storage_uri = None
     storage_options = {}
+    redis_client = None
 
     try:
         redis_url = Config.REDIS_URL
@@ -53,9 +57,15 @@ def create_app():
             storage_uri = redis_url
 
         storage_options = {"connection_pool": pool}
+        redis_client = client
     except Exception:
         pass
 
+    app.extensions['redis'] = redis_client
+    apple_keys.init_app(app, redis_client)
+    assets.init_app(app)
+    init_metrics(app)
+
     limiter_options = {
         "key_func": get_user_or_ip,
         "strategy": strategy,
@@ -86,10 +96,13 @@ def create_app():
         app.register_blueprint(ai_bp, url_prefix='/api/v1/ai')
 
         from .models import User, GratitudeEntry
-        db.create_all()
+
+        from .commands import register_commands
+        register_commands(app)
 
         @app.errorhandler(RateLimitExceeded)
         def handle_rate_limit_exceeded(e):
+            RATE_LIMITED.labels(request.endpoint or 'unknown').inc()
             return jsonify({
                 'message': 'Rate limit exceeded',
                 'error': 'too_many_requests',
@@ -121,6 +134,20 @@ def create_app():
             storage_type = type(storage).__name__ if storage else "None"
             return jsonify({'storage_type': storage_type})
 
+        @app.route('/api/v1/summarycachedata')
+        @limiter.exempt
+        def summarycachedata():
+            from .helpers.summary_cache import summary_cache
+            return jsonify(summary_cache.stats())
+
+        @app.route('/metrics')
+        @limiter.exempt
+        def metrics():
+            token = request.headers.get('Authorization', '')
+            if not Config.METRICS_TOKEN or not hmac.compare_digest(token, f"Bearer {Config.METRICS_TOKEN}"):
+                return handle_404(None)
+            return metrics_response()
+
         @app.route('/api/v1/commit')
         @limiter.exempt
         def commit():
@@ -143,9 +170,19 @@ def create_app():
         def download():
             return redirect(f"https://apps.apple.com/app/id{Config.APP_ID}")
 
+        # Fingerprinted output of `flask build-assets`, cached for a year
+        @app.route('/assets/<path:filename>', endpoint='assets')
+        @limiter.exempt
+        def serve_asset(filename):
+            return assets.send(filename)
+
         @app.route('/')
         @limiter.exempt
         def index():
-            return render_template('index.html')
+            return assets.page('index.html')
+
+        # The landing page is rendered once per worker instead of per hit
+        if not app.debug:
+            assets.defer_prerender('index.html', Config.PUBLIC_URL)
 
     return app
@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+from redis.exceptions import WatchError
+from .. import db
+from ..helpers.crypto import encrypt, decrypt
+from .pipeline import summarize_period
+import json
+import threading
+import time
+import uuid
+
+JOB_QUEUE_KEY = "summary_jobs:queue"
+JOB_TTL = 3600
+USER_JOB_TTL = 600
+WORKER_POLL_TIMEOUT = 5
+FINISHED_STATUSES = ('done', 'failed')
+JOB_PERIODS = ('month', 'quarter', 'year')
+
+
+def job_key(job_id):
+    return f"summary_job:{job_id}"
+
+
+def user_job_key(user_id, period):
+    return f"summary_job:user:{user_id}:{period}"
+
+
+# Deletes `key` only while it still holds `expected`, so a job never clears
+# a key another request has since claimed
+def release_user_job(redis_client, key, expected):
+    with redis_client.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.get(key) == expected:
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+        except WatchError:
+            pass
+
+
+# Queues a summary of `period` for user_id. A user has at most one queued or
+# running job per period; asking again returns the existing job instead of a
+# new one. The per-period key is only ever claimed with SET NX, so concurrent
+# requests cannot both queue a job.
+def enqueue_summary_job(redis_client, user_id, period='month'):
+    key = user_job_key(user_id, period)
+    job_id = uuid.uuid4().hex
+
+    while not redis_client.set(key, job_id, nx=True, ex=USER_JOB_TTL):
+        existing_id = redis_client.get(key)
+        existing = existing_id and get_job(redis_client, existing_id.decode())
+        if existing and existing['status'] not in FINISHED_STATUSES:
+            return existing_id.decode(), False
+        # The job behind the key finished or expired; free the key and retry
+        if existing_id:
+            release_user_job(redis_client, key, existing_id)
+
+    pipe = redis_client.pipeline()
+    pipe.hset(job_key(job_id), mapping={
+        'user_id': user_id,
+        'period': period,
+        'status': 'queued',
+        'created_at': datetime.now(timezone.utc).isoformat()
+    })
+    pipe.expire(job_key(job_id), JOB_TTL)
+    pipe.lpush(JOB_QUEUE_KEY, job_id)
+    pipe.execute()
+    return job_id, True
+
+
+def get_job(redis_client, job_id):
+    raw = redis_client.hgetall(job_key(job_id))
+    if not raw:
+        return None
+
+    job = {k.decode(): v.decode() for k, v in raw.items()}
+    job['user_id'] = int(job['user_id'])
+    if 'result' in job:
+        job['result'] = json.loads(decrypt(job['result']))
+        job['status_code'] = int(job['status_code'])
+    return job
+
+
+def wait_for_job(redis_client, job_id, wait, interval=0.5):
+    deadline = time.monotonic() + wait
+    job = get_job(redis_client, job_id)
+    while job and job['status'] not in FINISHED_STATUSES and time.monotonic() < deadline:
+        time.sleep(interval)
+        job = get_job(redis_client, job_id)
+    return job
+
+
+def run_job(redis_client, job_id):
+    job = get_job(redis_client, job_id)
+    if not job or job['status'] != 'queued':
+        return
+
+    redis_client.hset(job_key(job_id), 'status', 'running')
+    try:
+        body, status_code = summarize_period(job['user_id'], job.get('period', 'month'))
+    except Exception:
+        body, status_code = {'message': 'Error generating summary'}, 500
+
+    pipe = redis_client.pipeline()
+    pipe.hset(job_key(job_id), mapping={
+        'status': 'done' if status_code < 400 else 'failed',
+        'status_code': status_code,
+        'result': encrypt(json.dumps(body)),
+        'finished_at': datetime.now(timezone.utc).isoformat()
+    })
+    pipe.expire(job_key(job_id), JOB_TTL)
+    pipe.execute()
+
+    release_user_job(redis_client, user_job_key(job['user_id'], job.get('period', 'month')),
+                     job_id.encode())
+
+
+def run_workers(app, concurrency):
+    def work():
+        with app.app_context():
+            redis_client = app.extensions['redis']
+            while True:
+                item = redis_client.brpop(
+                    JOB_QUEUE_KEY, timeout=WORKER_POLL_TIMEOUT)
+                if item:
+                    run_job(redis_client, item[1].decode())
+                    db.session.remove()
+
+    threads = [threading.Thread(target=work, daemon=True)
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+from .. import db
+from ..models import GratitudeEntry
+from ..helpers.timezones import local_today, local_month_bounds_utc, to_local
+from ..helpers.user_cache import get_cached_user
+from ..helpers.summary_cache import summary_cache, entries_digest
+from .summary import SYSTEM_PROMPT, MODERATION_PREFIX, format_entries, prompt_payload, call_model
+import hashlib
+
+MAP_CONCURRENCY = 4
+PERIOD_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+PERIOD_NAMES = {'month': 'Monthly', 'quarter': 'Quarterly', 'year': 'Yearly'}
+
+_executor = ThreadPoolExecutor(max_workers=MAP_CONCURRENCY)
+
+
+# Local [start, end) dates of the calendar month, quarter or year containing today
+def period_bounds(today, period):
+    months = PERIOD_MONTHS[period]
+    first_month = (today.month - 1) // months * months + 1
+    start = date(today.year, first_month, 1)
+    end_index = today.year * 12 + first_month - 1 + months
+    return start, date(end_index // 12, end_index % 12 + 1, 1)
+
+
+def period_label(start, period):
+    if period == 'year':
+        return f"{start.year}"
+    if period == 'quarter':
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    return start.strftime('%Y-%m')
+
+
+def text_digest(kind, texts):
+    digest = hashlib.sha256(kind.encode())
+    for text in texts:
+        digest.update(b"\0" + text.encode())
+    return digest.hexdigest()
+
+
+def map_prompt(entries):
+    return prompt_payload(
+        f"{SYSTEM_PROMPT}\n\n"
+        "Read the following gratitude journal entries from a single week. "
+        "Write brief notes of at most 80 words that will later be combined with other weeks. "
+        "Capture the main themes, people, activities and emotional tone. "
+        "Do not mention the IDs of the entries:\n\n"
+        f"{format_entries(entries)}"
+    )
+
+
+def reduce_prompt(texts, scope, final):
+    numbered = "\n\n".join(f"Part {i}:\n{text}" for i,
+                           text in enumerate(texts, 1))
+    if final:
+        instructions = (
+            f"Read the following summaries of a user's gratitude journal for the past {scope}, oldest first, "
+            "and write a short, powerful summary of the whole period. Use simple language and concise phrases. "
+            "Avoid emojis and slang. Be direct and meaningful. Speak with second-person pronouns, as if you are "
+            "having a friendly, face-to-face conversation. Highlight the main themes, emotional tone, repeated ideas, "
+            "and any changes in mindset over time. Help the user see their growth and feel understood:"
+        )
+    else:
+        instructions = (
+            f"Combine the following notes on consecutive weeks of a user's gratitude journal into brief notes "
+            f"of at most 120 words for the whole {scope}. Keep the main themes, emotional tone and any changes over time:"
+        )
+    return prompt_payload(f"{instructions}\n\n{numbered}")
+
+
+# Runs (digest, build_payload) jobs through the model, reusing cached
+# partials. Payloads are only built (and entries only decrypted) for digests
+# missing from the cache. Cache access stays on the calling thread; only
+# model calls use the pool. Returns (texts in job order, None) or
+# (None, (response body, status code)).
+def run_cached(user_id, jobs):
+    texts = [summary_cache.get_partial(user_id, digest) for digest, _ in jobs]
+    missing = [i for i, text in enumerate(texts) if text is None]
+
+    try:
+        payloads = [jobs[i][1]() for i in missing]
+    except Exception:
+        return None, ({'message': 'Error retrieving entries'}, 500)
+
+    results = _executor.map(call_model, payloads)
+    for i, (text, error) in zip(missing, results):
+        if error:
+            return None, error
+        texts[i] = text
+        summary_cache.set_partial(user_id, jobs[i][0], text)
+    return texts, None
+
+
+# Summarizes the current month, quarter or year hierarchically: each week
+# (split at month boundaries) is summarized once and cached by the digest of
+# its entries, weeks are reduced into months, and months into the period.
+# Only windows whose entries changed go back to the model, and every prompt
+# stays the size of a week or a handful of partial summaries.
+#
+# Runs everything up to the final prompt. Returns ((payload, label, digest),
+# None) when the final prompt still has to be sent, or (None, (response body,
+# status code)) when the answer is already known (cached, flagged, no entries
+# or an error). With cached_only, returns (None, None) instead of doing any
+# model work.
+def prepare_period_summary(user_id, period, cached_only=False):
+    user = get_cached_user(user_id)
+    if not user or not user.user_timezone:
+        return None, ({'message': 'User or timezone not found'}, 404)
+
+    try:
+        start, end = period_bounds(local_today(user.user_timezone), period)
+        start_utc, _ = local_month_bounds_utc(
+            user.user_timezone, start.year, start.month)
+        end_utc, _ = local_month_bounds_utc(
+            user.user_timezone, end.year, end.month)
+    except ValueError as e:
+        return None, ({'message': str(e)}, 400)
+
+    entries = db.session.query(GratitudeEntry).filter(
+        GratitudeEntry.user_id == user_id,
+        GratitudeEntry.timestamp >= start_utc,
+        GratitudeEntry.timestamp < end_utc
+    ).order_by(GratitudeEntry.timestamp.asc()).all()
+
+    if not entries:
+        return None, ({'message': f'No entries found for this {period}'}, 200)
+
+    label = period_label(start, period)
+    message = period_message(period)
+    digest = entries_digest(entries)
+    cached_summary = summary_cache.get(user_id, label, digest)
+    if cached_summary:
+        return None, ({'message': message, 'summary': cached_summary, 'cached': True}, 200)
+    if cached_only:
+        return None, None
+
+    months = {}
+    for e in entries:
+        local_date = e.local_date or to_local(
+            e.timestamp, user.user_timezone).date()
+        window = max(local_date - timedelta(days=local_date.weekday()),
+                     local_date.replace(day=1))
+        months.setdefault((local_date.year, local_date.month), {}).setdefault(
+            window, []).append(e)
+
+    windows = [window_entries for month in sorted(months)
+               for _, window_entries in sorted(months[month].items())]
+    jobs = [(text_digest('map', [entries_digest(w)]), partial(map_prompt, w))
+            for w in windows]
+    partials, error = run_cached(user_id, jobs)
+    if error:
+        return None, error
+
+    # A flagged entry stops the summary exactly like the single-prompt version
+    flagged = next((p for p in partials if MODERATION_PREFIX in p), None)
+    if flagged:
+        return None, ({'message': message, 'summary': flagged}, 200)
+
+    if period != 'month':
+        grouped, offset = [], 0
+        for month in sorted(months):
+            grouped.append(partials[offset:offset + len(months[month])])
+            offset += len(months[month])
+        jobs = [(text_digest('month', texts), partial(reduce_prompt, texts, 'month', final=False))
+                for texts in grouped]
+        partials, error = run_cached(user_id, jobs)
+        if error:
+            return None, error
+
+    return (reduce_prompt(partials, period, final=True), label, digest), None
+
+
+def period_message(period):
+    return f'{PERIOD_NAMES[period]} summary generated'
+
+
+# Returns (response body, status code) so the same logic serves the
+# synchronous endpoints and the background job worker. With cached_only,
+# returns None instead of doing any model work.
+def summarize_period(user_id, period, cached_only=False):
+    plan, answer = prepare_period_summary(user_id, period, cached_only)
+    if plan is None:
+        return answer
+
+    payload, label, digest = plan
+    summary, error = call_model(payload)
+    if error:
+        return error
+
+    summary_cache.set(user_id, label, digest, summary)
+    return {'message': period_message(period), 'summary': summary}, 200
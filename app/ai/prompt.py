@@ -0,0 +1,82 @@
+# Compact entry encoding for model prompts. Each entry becomes a short block
+# of marker-prefixed lines instead of an indented JSON object, so the prompt
+# does not pay for whitespace, quoting and repeated key names:
+#
+#   #412
+#   + first gratitude
+#   + second gratitude
+#   + third gratitude
+#   ? prompt of the day
+#   > the user's answer
+from ..config import Config
+import math
+
+CHARS_PER_TOKEN = 4
+MAX_FIELD_CHARS = 600
+
+FORMAT_DESCRIPTION = (
+    "Entries are listed oldest first, one block per entry. Each block starts with a line '#<id>'. "
+    "Lines starting with '+' are things the user is grateful for, a line starting with '?' is the "
+    "reflection prompt the user was shown, and a line starting with '>' is their response to it."
+)
+
+
+# Rough local token count. Gemini's tokenizer averages about four characters
+# per token on English prose, which is close enough for budgeting.
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clean(text, limit=MAX_FIELD_CHARS):
+    text = " ".join((text or "").split())
+    if len(text) > limit:
+        text = text[:limit].rsplit(" ", 1)[0] + "…"
+    return text
+
+
+def encode_entry(entry_id, fields):
+    lines = [f"#{entry_id}"]
+    for name in ('entry1', 'entry2', 'entry3'):
+        if fields.get(name):
+            lines.append(f"+ {clean(fields[name])}")
+    if fields.get('user_prompt'):
+        lines.append(f"? {clean(fields['user_prompt'])}")
+    if fields.get('user_prompt_response'):
+        lines.append(f"> {clean(fields['user_prompt_response'])}")
+    return "\n".join(lines)
+
+
+# Picks k of n indices spread evenly across the range, always keeping the
+# first and last entry so the sample still spans the whole period
+def spread(n, k):
+    if k >= n:
+        return list(range(n))
+    if k <= 1:
+        return [n - 1][:k]
+    return sorted({round(i * (n - 1) / (k - 1)) for i in range(k)})
+
+
+# rows is a list of (entry id, decrypted fields) oldest first. Returns the
+# encoded text, dropping entries evenly across the period when the estimate
+# exceeds the token budget. The same rows always produce the same text.
+def encode_entries(rows, budget=None):
+    budget = budget or Config.AI_PROMPT_TOKEN_BUDGET
+    blocks = [encode_entry(entry_id, fields) for entry_id, fields in rows]
+    costs = [estimate_tokens(block) + 1 for block in blocks]
+
+    total = sum(costs)
+    if total <= budget:
+        return "\n".join(blocks)
+
+    keep = min(len(blocks), len(blocks) * budget // total)
+    while keep > 0:
+        chosen = spread(len(blocks), keep)
+        if sum(costs[i] for i in chosen) <= budget:
+            break
+        keep -= 1
+    else:
+        # A single entry over budget is still better than an empty prompt
+        chosen = [len(blocks) - 1]
+
+    header = f"({len(chosen)} of {len(blocks)} entries shown, evenly spaced)"
+    return "\n".join([header] + [blocks[i] for i in chosen])
@@ -2,8 +2,11 @@ from flask import Blueprint, request, jsonify
 from ..models import User
 from .. import db
 from ..helpers.utils import encode_token, is_email_taken, verify_apple_token
+from ..helpers.etag import bump_data_version
+from ..helpers.user_cache import invalidate_user
+from ..helpers.timezones import is_valid_timezone
+from ..helpers.unlock_index import set_unlock_minute
 from ..config import Config
-import pytz
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -20,7 +23,7 @@ def applelogin():
     if not user_timezone:
         return jsonify({'message': 'Could not fetch user timezone'}), 400
 
-    if user_timezone not in pytz.all_timezones:
+    if not is_valid_timezone(user_timezone):
         return jsonify({'message': 'Invalid timezone'}), 400
 
     given_name = fullName.get("givenName")
@@ -45,7 +48,10 @@ def applelogin():
     if user:
         if not user.account_active:
             user.account_active = True
+            set_unlock_minute(user)
             db.session.commit()
+            invalidate_user(user.user_id)
+            bump_data_version(user.user_id)
 
     if not user:
         if Config.DEV_MODE:
@@ -55,6 +61,7 @@ def applelogin():
                 apple_user_id=apple_user_id,
                 user_timezone=user_timezone
             )
+            set_unlock_minute(user)
             db.session.add(user)
             db.session.commit()
             return jsonify({'token': encode_token(user.user_id)}), 200
@@ -71,6 +78,7 @@ def applelogin():
             apple_user_id=apple_user_id,
             user_timezone=user_timezone
         )
+        set_unlock_minute(user)
         db.session.add(user)
         db.session.commit()
 
@@ -0,0 +1,125 @@
+import click
+
+
+def register_commands(app):
+    @app.cli.command('migrate-entry-format')
+    @click.option('--batch-size', default=500, show_default=True)
+    def migrate_entry_format(batch_size):
+        from .helpers.crypto import migrate_legacy_entries
+
+        migrated = migrate_legacy_entries(batch_size)
+        click.echo(f"Migrated {migrated} entries to the single-payload format")
+
+    @app.cli.command('ai-worker')
+    @click.option('--concurrency', default=4, show_default=True)
+    def ai_worker(concurrency):
+        from .ai.jobs import run_workers
+
+        if app.extensions.get('redis') is None:
+            raise click.ClickException("Redis is required to run AI workers")
+
+        click.echo(f"Starting {concurrency} summary workers")
+        run_workers(app, concurrency)
+
+    @app.cli.command('backfill-calendar')
+    @click.option('--batch-size', default=200, show_default=True)
+    def backfill_calendar(batch_size):
+        from . import db
+        from .models import User
+        from .helpers.calendar import rebuild_user_calendar
+
+        rebuilt = 0
+        last_id = 0
+        while True:
+            users = User.query.filter(User.user_id > last_id).order_by(
+                User.user_id.asc()).limit(batch_size).all()
+            if not users:
+                break
+            for user in users:
+                if user.user_timezone:
+                    rebuild_user_calendar(user)
+            db.session.commit()
+            rebuilt += len(users)
+            last_id = users[-1].user_id
+
+        click.echo(f"Rebuilt calendars for {rebuilt} users")
+
+    @app.cli.command('backfill-stats')
+    @click.option('--batch-size', default=200, show_default=True)
+    @click.option('--missing', is_flag=True, help="Only users without a stats row, e.g. on every deploy")
+    def backfill_stats(batch_size, missing):
+        from . import db
+        from .models import User, UserStats
+        from .helpers.stats import recompute_user_stats
+
+        rebuilt = 0
+        last_id = 0
+        while True:
+            query = db.session.query(User.user_id).filter(User.user_id > last_id)
+            if missing:
+                query = query.outerjoin(UserStats, UserStats.user_id == User.user_id).filter(
+                    UserStats.user_id.is_(None))
+            user_ids = [user_id for (user_id,) in query.order_by(User.user_id.asc()).limit(batch_size)]
+            if not user_ids:
+                break
+            for user_id in user_ids:
+                recompute_user_stats(user_id)
+            db.session.commit()
+            rebuilt += len(user_ids)
+            last_id = user_ids[-1]
+
+        click.echo(f"Rebuilt stats for {rebuilt} users")
+
+    @app.cli.command('backfill-search-index')
+    @click.option('--batch-size', default=500, show_default=True)
+    @click.option('--rebuild', is_flag=True, help="Drop the index first, e.g. after changing SEARCH_INDEX_KEY")
+    def backfill_search_index(batch_size, rebuild):
+        from . import db
+        from .models import EntrySearchToken
+        from .helpers.search import build_search_index
+
+        if rebuild:
+            EntrySearchToken.query.delete()
+            db.session.commit()
+
+        indexed = build_search_index(batch_size)
+        click.echo(f"Indexed {indexed} entries")
+
+    @app.cli.command('rebuild-unlock-index')
+    def rebuild_unlock_index():
+        from .helpers.unlock_index import refresh_unlock_index
+
+        updated = refresh_unlock_index()
+        click.echo(f"Updated the unlock minute of {updated} users")
+
+    @app.cli.command('reminder-scheduler')
+    @click.option('--sink', default=None, help="'log' or 'jsonl:/path' (default: REMINDER_SINK)")
+    @click.option('--once', is_flag=True, help="Process the current minute and exit")
+    def reminder_scheduler(sink, once):
+        from .config import Config
+        from .reminders.scheduler import run_scheduler
+        from .reminders.sinks import get_sink
+        import logging
+
+        try:
+            sink = get_sink(sink or Config.REMINDER_SINK)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        # The scheduler and log sink report through app.reminders.* loggers
+        app.logger.setLevel(logging.INFO)
+
+        run_scheduler(app, sink, once=once)
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        from .helpers.assets import build_assets, Image, brotli
+
+        if Image is None:
+            click.echo("Pillow is not installed; skipping WebP/AVIF variants")
+        if brotli is None:
+            click.echo("brotli is not installed; writing gzip copies only")
+
+        manifest = build_assets(app.static_folder)
+        variants = sum(len(entry['variants']) for entry in manifest.values())
+        click.echo(f"Built {len(manifest)} assets and {variants} image variants")
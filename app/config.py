@@ -4,15 +4,59 @@ import os
 load_dotenv()
 
 
+# Pool settings for Postgres engines. SQLite (used by the benchmark suite)
+# keeps SQLAlchemy's defaults, since its pools take none of these options.
+def engine_options(uri):
+    if not uri or uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+    if statement_timeout:
+        options['connect_args'] = {
+            'options': f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
 class Config:
-    APPLE_KEYS_URL = "https://appleid.apple.com/auth/keys"
+    APPLE_KEYS_URL = os.getenv(
+        'APPLE_KEYS_URL', "https://appleid.apple.com/auth/keys")
     APPLE_ISSUER = "https://appleid.apple.com"
     APPLE_AUDIENCE = "app.gratefultime"
     APP_ID = "6746601767"
+    PUBLIC_URL = os.getenv('PUBLIC_URL', "https://gratefultime.app")
     SECRET_KEY = os.environ['SECRET_KEY']
     ENCRYPTION_KEY = os.environ['ENCRYPTION_KEY']
+    # Keys the blind search index; derived from ENCRYPTION_KEY when unset
+    SEARCH_INDEX_KEY = os.getenv('SEARCH_INDEX_KEY')
     GEMINI_API_KEY = os.environ['GEMINI_API_KEY']
+    GEMINI_API_BASE = os.getenv(
+        'GEMINI_API_BASE', "https://generativelanguage.googleapis.com")
     REDIS_URL = os.environ['REDIS_URL']
     SQLALCHEMY_DATABASE_URI = os.environ['SQLALCHEMY_DATABASE_URI']
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Optional read replica for read-only views (see helpers/replica.py)
+    SQLALCHEMY_REPLICA_URI = os.getenv('SQLALCHEMY_REPLICA_URI')
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': SQLALCHEMY_REPLICA_URI, **engine_options(SQLALCHEMY_REPLICA_URI)}
+    } if SQLALCHEMY_REPLICA_URI else {}
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 50))
+    SUMMARY_CACHE_TTL = int(os.getenv('SUMMARY_CACHE_TTL', 7 * 24 * 3600))
+    EXPORT_MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', 1))
+    SYNC_MAX_BATCH = int(os.getenv('SYNC_MAX_BATCH', 31))
+    SYNC_MAX_AGE_DAYS = int(os.getenv('SYNC_MAX_AGE_DAYS', 31))
+    AI_PROMPT_TOKEN_BUDGET = int(os.getenv('AI_PROMPT_TOKEN_BUDGET', 24000))
+    REMINDER_SINK = os.getenv('REMINDER_SINK', 'log')
+    REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    RATELIMIT_ENABLED = os.getenv(
+        'RATELIMIT_ENABLED', 'true').lower() == 'true'
     DEV_MODE = os.getenv('GRATEFULTIME_DEV_MODE', 'false').lower() == 'true'
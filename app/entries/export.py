@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select
+from .. import db
+from ..config import Config
+from ..models import GratitudeEntry
+from ..helpers.crypto import ENTRY_FIELDS
+from ..helpers.utils import get_redis
+from ..helpers.serialize import serialize_entries
+import csv
+import io
+import json
+import threading
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_LOCK_TTL = 3600
+EXPORT_COLUMNS = ('id', 'local_date') + ENTRY_FIELDS + ('timestamp',)
+
+_executor = ThreadPoolExecutor(max_workers=4)
+_local_active = {}
+_local_lock = threading.Lock()
+
+
+def active_key(user_id):
+    return f"export_active:{user_id}"
+
+
+def acquire_export_slot(user_id):
+    redis_client = get_redis()
+    if redis_client is not None:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(active_key(user_id))
+            pipe.expire(active_key(user_id), EXPORT_LOCK_TTL)
+            active, _ = pipe.execute()
+            if active > Config.EXPORT_MAX_CONCURRENT:
+                redis_client.decr(active_key(user_id))
+                return False
+            return True
+        except Exception:
+            pass
+
+    with _local_lock:
+        if _local_active.get(user_id, 0) >= Config.EXPORT_MAX_CONCURRENT:
+            return False
+        _local_active[user_id] = _local_active.get(user_id, 0) + 1
+        return True
+
+
+def release_export_slot(user_id):
+    redis_client = get_redis()
+    if redis_client is not None:
+        try:
+            redis_client.decr(active_key(user_id))
+            return
+        except Exception:
+            pass
+
+    with _local_lock:
+        _local_active[user_id] = max(_local_active.get(user_id, 1) - 1, 0)
+
+
+def decrypt_rows(rows):
+    return serialize_entries(rows, local_date=True)
+
+
+# Streams the user's entries oldest first through a server-side cursor.
+# Batch N+1 is fetched while batch N is decrypted on the thread pool, so at
+# most two batches are held in memory regardless of journal size.
+def iter_decrypted_batches(user_id):
+    stmt = select(
+        GratitudeEntry.id, GratitudeEntry.timestamp, GratitudeEntry.local_date,
+        GratitudeEntry.payload, *(getattr(GratitudeEntry, f)
+                                  for f in ENTRY_FIELDS)
+    ).where(
+        GratitudeEntry.user_id == user_id
+    ).order_by(
+        GratitudeEntry.timestamp.asc(), GratitudeEntry.id.asc()
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    pending = None
+    for rows in db.session.execute(stmt).partitions():
+        future = _executor.submit(decrypt_rows, rows)
+        if pending is not None:
+            yield pending.result()
+        pending = future
+    if pending is not None:
+        yield pending.result()
+
+
+def export_ndjson(user_id):
+    for batch in iter_decrypted_batches(user_id):
+        yield ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in batch)
+
+
+def export_csv(user_id):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for batch in iter_decrypted_batches(user_id):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
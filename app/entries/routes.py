@@ -1,68 +1,88 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timezone
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import tuple_, or_
+from sqlalchemy.exc import IntegrityError
 from .. import db
-from ..models import GratitudeEntry, User
-from ..helpers.utils import require_auth, format_timestamp, convert_utc_to_local
+from ..models import GratitudeEntry
+from ..helpers.utils import require_auth, get_current_user, format_timestamp, encode_cursor, decode_cursor, upsert_insert
+from ..helpers.crypto import encrypt_entry
+from ..helpers.summary_cache import summary_cache, month_key
+from .export import export_ndjson, export_csv, acquire_export_slot, release_export_slot
+from ..helpers.timezones import to_local, local_now, local_today, local_day_bounds_utc
+from ..helpers.replica import read_replica
+from ..helpers.serialize import serialize_entries, serialize_entry
+from ..helpers.etag import conditional_get, bump_data_version
+from ..helpers.stats import record_entry_day, remove_entry_day
+from ..helpers.search import index_entry, unindex_entry, search_query
+from ..helpers.calendar import (mark_entry_day, clear_entry_day, get_calendar_months,
+                                month_index, parse_month, format_month, bitmap_days)
 from ..config import Config
-import pytz
-from cryptography.fernet import Fernet
 
 entries_bp = Blueprint('entries', __name__)
 
-
-def get_cipher():
-    return Fernet(Config.ENCRYPTION_KEY)
-
-
-def encrypt(text):
-    return get_cipher().encrypt(text.encode()).decode()
-
-
-def decrypt(token):
-    return get_cipher().decrypt(token.encode()).decode()
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'csv': (export_csv, 'text/csv')
+}
 
 
 # GETS ENTRIES WITH PAGINATION
 @entries_bp.route('', methods=['GET'])
 @require_auth
+@conditional_get()
+@read_replica
 def get_entries():
-    limit = int(request.args.get('limit', 10))
-    offset = int(request.args.get('offset', 0))
-
-    total_entries = GratitudeEntry.query.filter_by(
-        user_id=request.user_id).count()
-    query = GratitudeEntry.query.filter_by(
-        user_id=request.user_id).order_by(GratitudeEntry.timestamp.desc())
-    entries = query.offset(offset).limit(limit).all()
-    next_offset = offset + limit if offset + limit < total_entries else None
-
-    return jsonify({
+    try:
+        limit = int(request.args.get('limit', 10))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'message': 'limit and offset must be integers'}), 400
+
+    if limit < 1:
+        return jsonify({'message': 'limit must be positive'}), 400
+    if offset < 0:
+        return jsonify({'message': 'offset must not be negative'}), 400
+    limit = min(limit, Config.MAX_PAGE_SIZE)
+
+    query = GratitudeEntry.query.filter_by(user_id=request.user_id).order_by(
+        GratitudeEntry.timestamp.desc(), GratitudeEntry.id.desc())
+
+    # Cursor mode: ?cursor= (empty for the first page) switches to keyset
+    # pagination on (timestamp, id) and returns nextCursor instead of nextOffset
+    cursor_mode = 'cursor' in request.args
+    if cursor_mode and request.args['cursor']:
+        try:
+            cursor_ts, cursor_id = decode_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        query = query.filter(tuple_(GratitudeEntry.timestamp, GratitudeEntry.id)
+                             < tuple_(cursor_ts, cursor_id))
+    elif not cursor_mode:
+        query = query.offset(offset)
+
+    # One extra row tells us whether another page exists without a count()
+    entries = query.limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    response = {
         'message': 'Entries retrieved successfully',
-        'data': [{
-            'id': e.id,
-            'entry1': decrypt(e.entry1),
-            'entry2': decrypt(e.entry2),
-            'entry3': decrypt(e.entry3),
-            'user_prompt': decrypt(e.user_prompt),
-            'user_prompt_response': decrypt(e.user_prompt_response),
-            'timestamp': format_timestamp(e.timestamp)
-        } for e in entries],
-        'nextOffset': next_offset
-    })
+        'data': serialize_entries(entries)
+    }
 
+    if cursor_mode:
+        last = entries[-1] if has_more else None
+        response['nextCursor'] = encode_cursor(
+            last.timestamp, last.id) if last else None
+    else:
+        response['nextOffset'] = offset + limit if has_more else None
 
-# SUBMIT ENTRY
-@entries_bp.route('', methods=['POST'])
-@require_auth
-def submit_entry():
-    user = User.query.filter_by(user_id=request.user_id).first()
-    if not user or not user.account_active:
-        return jsonify({'message': 'Please login to your account', 'errorCode': 'submission'}), 403
+    return jsonify(response)
 
-    data = request.get_json()
 
+def validate_entry_fields(data):
     def is_invalid_field(value, min_length, max_length):
-        if not value or not value.strip():
+        if not value or not isinstance(value, str) or not value.strip():
             return True
         length = len(value.strip())
         return length < min_length or length > max_length
@@ -80,36 +100,49 @@ def submit_entry():
     for field, (max_len, error_code) in validation_rules.items():
         value = data.get(field, '')
         if is_invalid_field(value, min_length, max_len):
-            return jsonify({'message': f'Must be between {min_length} to {max_len} characters', 'errorCode': error_code}), 403
+            return {'message': f'Must be between {min_length} to {max_len} characters', 'errorCode': error_code}
+    return None
 
-    try:
-        now_local = convert_utc_to_local(
-            datetime.now(timezone.utc), user.user_timezone)
-    except ValueError as e:
-        return jsonify({'message': str(e)}), 400
 
-    start_of_today_local = now_local.replace(
-        hour=0, minute=0, second=0, microsecond=0)
-    start_of_today_utc = start_of_today_local.astimezone(pytz.utc)
+# SUBMIT ENTRY
+@entries_bp.route('', methods=['POST'])
+@require_auth
+def submit_entry():
+    user = get_current_user()
+    if not user or not user.account_active:
+        return jsonify({'message': 'Please login to your account', 'errorCode': 'submission'}), 403
 
-    existing_entry = GratitudeEntry.query.filter(
-        GratitudeEntry.user_id == request.user_id,
-        GratitudeEntry.timestamp >= start_of_today_utc
-    ).first()
+    data = request.get_json()
 
-    if existing_entry:
-        return jsonify({'message': 'Already submitted today', 'errorCode': 'submission'}), 400
+    error = validate_entry_fields(data)
+    if error:
+        return jsonify(error), 403
+
+    try:
+        now_local = local_now(user.user_timezone)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
     entry = GratitudeEntry(
         user_id=request.user_id,
-        entry1=encrypt(data['entry1']),
-        entry2=encrypt(data['entry2']),
-        entry3=encrypt(data['entry3']),
-        user_prompt=encrypt(data['user_prompt']),
-        user_prompt_response=encrypt(data['user_prompt_response'])
+        payload=encrypt_entry(data),
+        local_date=now_local.date()
     )
-    db.session.add(entry)
+
+    # The unique (user_id, local_date) constraint enforces one entry per day
+    try:
+        db.session.add(entry)
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Already submitted today', 'errorCode': 'submission'}), 400
+
+    mark_entry_day(request.user_id, now_local.date())
+    record_entry_day(request.user_id, now_local.date())
+    index_entry(request.user_id, entry.id, data)
     db.session.commit()
+    summary_cache.invalidate(request.user_id, month_key(now_local))
+    bump_data_version(request.user_id)
 
     return jsonify({'message': 'Entry saved', 'data': {
         'id': entry.id,
@@ -117,16 +150,187 @@ def submit_entry():
     }}), 201
 
 
+def parse_month_range(args):
+    start = args.get('from') or args.get('to')
+    end = args.get('to') or args.get('from')
+    start_month, end_month = parse_month(start), parse_month(end)
+    if start_month > end_month:
+        raise ValueError("from must not be after to")
+    return start_month, end_month
+
+
+# SUBMIT A BATCH OF ENTRIES QUEUED BY THE APP WHILE OFFLINE
+# Each item carries an idempotency_key and the local_date it was written on.
+# Items are validated like submit_entry, inserted with one statement, and
+# reported individually as created, duplicate, conflict or invalid.
+@entries_bp.route('/sync', methods=['POST'])
+@require_auth
+def sync_entries():
+    user = get_current_user()
+    if not user or not user.account_active:
+        return jsonify({'message': 'Please login to your account', 'errorCode': 'submission'}), 403
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'message': 'Body must be a JSON object with an entries list'}), 400
+
+    items = body.get('entries')
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'entries must be a non-empty list'}), 400
+    if len(items) > Config.SYNC_MAX_BATCH:
+        return jsonify({'message': f'At most {Config.SYNC_MAX_BATCH} entries per sync'}), 400
+
+    try:
+        today = local_today(user.user_timezone)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    earliest = today - timedelta(days=Config.SYNC_MAX_AGE_DAYS)
+
+    results = [None] * len(items)
+    accepted = {}
+    seen_keys, seen_dates = set(), set()
+
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[i] = {'status': 'invalid', 'message': 'Entry must be an object'}
+            continue
+
+        key = item.get('idempotency_key')
+        results[i] = {'idempotency_key': key}
+        if not isinstance(key, str) or not 0 < len(key) <= 64 or key in seen_keys:
+            results[i].update(status='invalid', message='Missing or repeated idempotency_key')
+            continue
+        seen_keys.add(key)
+
+        try:
+            local_date = date.fromisoformat(item.get('local_date', ''))
+        except (TypeError, ValueError):
+            results[i].update(status='invalid', message='local_date must be YYYY-MM-DD')
+            continue
+        if not earliest <= local_date <= today:
+            results[i].update(status='invalid', message='local_date is out of range')
+            continue
+
+        error = validate_entry_fields(item)
+        if error:
+            results[i].update(status='invalid', **error)
+            continue
+
+        if local_date in seen_dates:
+            results[i].update(status='conflict', message='Already submitted for this day', errorCode='submission')
+            continue
+        seen_dates.add(local_date)
+        accepted[key] = (i, local_date)
+
+    if accepted:
+        existing = db.session.query(
+            GratitudeEntry.id, GratitudeEntry.idempotency_key,
+            GratitudeEntry.local_date, GratitudeEntry.timestamp
+        ).filter(
+            GratitudeEntry.user_id == request.user_id,
+            or_(GratitudeEntry.idempotency_key.in_(list(accepted)),
+                GratitudeEntry.local_date.in_([d for _, d in accepted.values()]))
+        ).all()
+
+        existing_keys = {row.idempotency_key: row for row in existing}
+        existing_dates = {row.local_date for row in existing}
+        for key, (i, local_date) in list(accepted.items()):
+            if key in existing_keys:
+                row = existing_keys[key]
+                results[i].update(status='duplicate', id=row.id,
+                                  timestamp=format_timestamp(row.timestamp))
+                del accepted[key]
+            elif local_date in existing_dates:
+                results[i].update(status='conflict', message='Already submitted for this day',
+                                  errorCode='submission')
+                del accepted[key]
+
+    if accepted:
+        now = datetime.now(timezone.utc)
+        rows = []
+        for key, (i, local_date) in accepted.items():
+            if local_date == today:
+                timestamp = now
+            else:
+                start_utc, end_utc = local_day_bounds_utc(user.user_timezone, local_date)
+                timestamp = start_utc + (end_utc - start_utc) / 2
+            rows.append({
+                'user_id': request.user_id,
+                'payload': encrypt_entry(items[i]),
+                'local_date': local_date,
+                'idempotency_key': key,
+                'timestamp': timestamp
+            })
+
+        # Rows that lose a race with a concurrent submit are skipped by the
+        # unique constraints and reported as conflicts below
+        inserted = db.session.execute(
+            upsert_insert(GratitudeEntry).values(rows).on_conflict_do_nothing().returning(
+                GratitudeEntry.id, GratitudeEntry.idempotency_key,
+                GratitudeEntry.local_date, GratitudeEntry.timestamp)
+        ).all()
+
+        # Oldest first so the stats row takes the O(1) path for each day
+        for row in sorted(inserted, key=lambda row: row.local_date):
+            mark_entry_day(request.user_id, row.local_date)
+            record_entry_day(request.user_id, row.local_date)
+            index_entry(request.user_id, row.id, items[accepted[row.idempotency_key][0]])
+        db.session.commit()
+
+        inserted_keys = {row.idempotency_key: row for row in inserted}
+        for key, (i, local_date) in accepted.items():
+            row = inserted_keys.get(key)
+            if row:
+                results[i].update(status='created', id=row.id,
+                                  timestamp=format_timestamp(row.timestamp))
+            else:
+                results[i].update(status='conflict', message='Already submitted for this day',
+                                  errorCode='submission')
+
+        for month in {month_key(row.local_date) for row in inserted}:
+            summary_cache.invalidate(request.user_id, month)
+        if inserted:
+            bump_data_version(request.user_id)
+
+    return jsonify({'message': 'Entries synced', 'data': results})
+
+
 # GETS ALL THE DAYS THAT A USER HAS CREATED AN ENTRY
+# With ?from=YYYY-MM&to=YYYY-MM the days come from the calendar table for that
+# range only. Without them the full history is returned in the original
+# {id, timestamp} shape: released app versions open an entry from the calendar
+# by that id, which the calendar table does not store, so this path still
+# reads the entries: two columns found through the (user_id, timestamp)
+# index, served from the replica and behind the ETag check. New clients
+# should pass a range.
 @entries_bp.route('/days', methods=['GET'])
 @require_auth
+@conditional_get()
+@read_replica
 def get_entry_days():
+    if 'from' in request.args or 'to' in request.args:
+        try:
+            start_month, end_month = parse_month_range(request.args)
+        except ValueError:
+            return jsonify({'message': 'from and to must be months formatted YYYY-MM'}), 400
+
+        months = get_calendar_months(request.user_id, start_month, end_month)
+        return jsonify({
+            'message': 'Entry days retrieved',
+            'data': [
+                {
+                    'month': format_month(m.month),
+                    'days': bitmap_days(m.days)
+                } for m in months if m.days
+            ]
+        })
+
     entries = db.session.query(
         GratitudeEntry.id,
         GratitudeEntry.timestamp
     ).filter_by(
         user_id=request.user_id
-    ).distinct().all()
+    ).all()
 
     return jsonify({
         'message': 'Entry days retrieved',
@@ -140,47 +344,111 @@ def get_entry_days():
 
 
 # COUNT THE DAYS A USER HAS POSTED THIS MONTH
+# ?from=YYYY-MM&to=YYYY-MM additionally returns the count for each month in range
 @entries_bp.route('/user_month_days', methods=['GET'])
 @require_auth
+@conditional_get(vary_by_time=True)
+@read_replica
 def user_month_days():
-    user = db.session.query(User).filter_by(user_id=request.user_id).first()
+    user = get_current_user()
     if not user or not user.user_timezone:
         return jsonify({'message': 'User or timezone not found'}), 404
 
     try:
-        now_user_tz = convert_utc_to_local(
-            datetime.now(timezone.utc), user.user_timezone)
+        current_month = month_index(local_today(user.user_timezone))
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
 
-    start_of_month_user = now_user_tz.replace(
-        day=1, hour=0, minute=0, second=0, microsecond=0)
-    if start_of_month_user.month == 12:
-        next_month = start_of_month_user.replace(
-            year=start_of_month_user.year + 1, month=1)
-    else:
-        next_month = start_of_month_user.replace(
-            month=start_of_month_user.month + 1)
+    start_month = end_month = current_month
+    if 'from' in request.args or 'to' in request.args:
+        try:
+            start_month, end_month = parse_month_range(request.args)
+        except ValueError:
+            return jsonify({'message': 'from and to must be months formatted YYYY-MM'}), 400
+
+    months = get_calendar_months(request.user_id, min(start_month, current_month),
+                                 max(end_month, current_month))
+    counts = {m.month: bin(m.days).count('1') for m in months}
+
+    response = {'message': 'Count of days with entries this month',
+                'days_count': counts.get(current_month, 0)}
+    if 'from' in request.args or 'to' in request.args:
+        response['months'] = [
+            {'month': format_month(index), 'days_count': count}
+            for index, count in sorted(counts.items())
+            if start_month <= index <= end_month
+        ]
+    return jsonify(response)
 
-    start_utc = start_of_month_user.astimezone(pytz.utc)
-    end_utc = next_month.astimezone(pytz.utc)
 
-    timestamps_utc = db.session.query(GratitudeEntry.timestamp).filter(
-        GratitudeEntry.user_id == request.user_id,
-        GratitudeEntry.timestamp >= start_utc,
-        GratitudeEntry.timestamp < end_utc
-    ).all()
+# EXPORT ALL ENTRIES AS NDJSON (DEFAULT) OR CSV
+@entries_bp.route('/export', methods=['GET'])
+@require_auth
+def export_entries():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'message': 'format must be ndjson or csv'}), 400
+
+    if not acquire_export_slot(request.user_id):
+        return jsonify({'message': 'An export is already in progress'}), 429
+
+    user_id = request.user_id
+    generate, mimetype = EXPORT_FORMATS[export_format]
+    app = current_app._get_current_object()
+
+    response = Response(stream_with_context(generate(user_id)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=gratefultime-export.{export_format}'
+    })
 
-    days = set()
-    for (ts_utc,) in timestamps_utc:
+    # The WSGI server closes every response, including ones whose body is
+    # never read (HEAD, client disconnects), so the slot is always returned
+    def release():
+        with app.app_context():
+            release_export_slot(user_id)
+
+    response.call_on_close(release)
+    return response
+
+
+# SEARCH ENTRIES BY KEYWORD (?q=words&limit=&cursor=)
+# Every word must appear in the entry. Matches come from the blind index, so
+# only the returned page is decrypted.
+@entries_bp.route('/search', methods=['GET'])
+@require_auth
+@conditional_get()
+@read_replica
+def search_entries():
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'message': 'limit must be positive'}), 400
+    limit = min(limit, Config.MAX_PAGE_SIZE)
+
+    try:
+        query = search_query(request.user_id, request.args.get('q', ''))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    if request.args.get('cursor'):
         try:
-            local_date = convert_utc_to_local(
-                ts_utc, user.user_timezone).date()
-        except ValueError as e:
-            return jsonify({'message': str(e)}), 400
-        days.add(local_date)
+            cursor_ts, cursor_id = decode_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        query = query.filter(tuple_(GratitudeEntry.timestamp, GratitudeEntry.id)
+                             < tuple_(cursor_ts, cursor_id))
 
-    return jsonify({'message': 'Count of days with entries this month', 'days_count': len(days)})
+    entries = query.limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    last = entries[-1] if has_more else None
+    return jsonify({
+        'message': 'Search results retrieved',
+        'data': serialize_entries(entries),
+        'nextCursor': encode_cursor(last.timestamp, last.id) if last else None
+    })
 
 
 # GET A SPECIFIC ENTRY BY ID
@@ -190,15 +458,7 @@ def get_entry(id):
     entry = GratitudeEntry.query.get_or_404(id)
     if entry.user_id != request.user_id:
         return jsonify({'message': 'Unauthorized access'}), 403
-    return jsonify({'message': 'Entry retrieved', 'data': {
-        'id': entry.id,
-        'entry1': decrypt(entry.entry1),
-        'entry2': decrypt(entry.entry2),
-        'entry3': decrypt(entry.entry3),
-        'user_prompt': decrypt(entry.user_prompt),
-        'user_prompt_response': decrypt(entry.user_prompt_response),
-        'timestamp': format_timestamp(entry.timestamp)
-    }})
+    return jsonify({'message': 'Entry retrieved', 'data': serialize_entry(entry)})
 
 
 # DELETE A SPECIFIC ENTRY
@@ -207,7 +467,7 @@ def get_entry(id):
 def delete_entry(id):
     entry = GratitudeEntry.query.get_or_404(id)
 
-    user = User.query.filter_by(user_id=request.user_id).first()
+    user = get_current_user()
     if not user or not user.user_timezone:
         return jsonify({'message': 'User or timezone not found'}), 404
 
@@ -215,10 +475,9 @@ def delete_entry(id):
         return jsonify({'message': 'Unauthorized'}), 403
 
     try:
-        entry_local_date = convert_utc_to_local(
+        entry_local_date = entry.local_date or to_local(
             entry.timestamp, user.user_timezone).date()
-        now_local_date = convert_utc_to_local(
-            datetime.now(timezone.utc), user.user_timezone).date()
+        now_local_date = local_today(user.user_timezone)
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
 
@@ -226,5 +485,10 @@ def delete_entry(id):
         return jsonify({'message': 'Can only delete today\'s entry'}), 400
 
     db.session.delete(entry)
+    clear_entry_day(request.user_id, entry_local_date)
+    remove_entry_day(request.user_id, entry_local_date)
+    unindex_entry(request.user_id, entry.id)
     db.session.commit()
+    summary_cache.invalidate(request.user_id, month_key(entry_local_date))
+    bump_data_version(request.user_id)
     return jsonify({'message': 'Entry deleted'})
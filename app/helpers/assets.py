@@ -0,0 +1,199 @@
+from flask import current_app, request, url_for, render_template, make_response, send_from_directory
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+IMAGE_TYPES = ('.png', '.jpg', '.jpeg')
+IMAGE_VARIANTS = {'avif': ('AVIF', {'quality': 60}),
+                  'webp': ('WEBP', {'quality': 82, 'method': 6})}
+TEXT_TYPES = ('.css', '.js', '.svg', '.txt', '.json', '.html')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'public, max-age=300'
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def available_encodings():
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS
+            if encoding != 'br' or brotli is not None]
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# Writes an image variant next to the fingerprinted original, keeping it only
+# when it is actually smaller. Returns the variant's dist path or None.
+def write_image_variant(source, dist, stem, variant, original_size):
+    image_format, options = IMAGE_VARIANTS[variant]
+    target = f"{stem}.{variant}"
+    path = os.path.join(dist, target)
+    try:
+        with Image.open(source) as image:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            image.save(path, image_format, **options)
+    except (KeyError, OSError, ValueError):
+        # This Pillow build cannot encode the format
+        return None
+
+    if os.path.getsize(path) >= original_size:
+        os.remove(path)
+        return None
+    return target
+
+
+# Copies every file under static_folder into static_folder/dist with a content
+# hash in its name, adds WebP/AVIF variants of images when Pillow is installed
+# and gzip/brotli copies of text assets, and writes the manifest that maps
+# logical names ('css/main.css') to what was built. Returns the manifest.
+def build_assets(static_folder):
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            base, ext = os.path.splitext(logical)
+            stem = f"{base}.{hashlib.sha256(data).hexdigest()[:12]}"
+            entry = {'path': f"{stem}{ext}", 'variants': {}, 'encodings': []}
+            write_file(os.path.join(dist, entry['path']), data)
+
+            if ext.lower() in IMAGE_TYPES and Image is not None:
+                for variant in IMAGE_VARIANTS:
+                    target = write_image_variant(source, dist, stem, variant, len(data))
+                    if target:
+                        entry['variants'][variant] = target
+
+            if ext.lower() in TEXT_TYPES:
+                for encoding, suffix in available_encodings():
+                    compressed = compress(data, encoding)
+                    if len(compressed) < len(data):
+                        write_file(os.path.join(dist, entry['path'] + suffix), compressed)
+                        entry['encodings'].append(encoding)
+
+            manifest[logical] = entry
+
+    write_file(os.path.join(dist, MANIFEST_FILE),
+               json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+# Serves the output of build_assets. Without a build (local development, the
+# benchmark suite) asset_url falls back to the plain static route.
+class AssetPipeline:
+    def __init__(self):
+        self.manifest = {}
+        self.encodings = {}
+        self.directory = None
+        self.pages = {}
+        self.deferred = {}
+
+    def init_app(self, app):
+        self.directory = os.path.join(app.static_folder, DIST_DIR)
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.encodings = {entry['path']: entry['encodings']
+                          for entry in self.manifest.values()}
+        app.jinja_env.globals['asset_url'] = self.url
+        app.extensions['assets'] = self
+
+    def url(self, filename, variant=None, **kwargs):
+        entry = self.manifest.get(filename)
+        if entry is None:
+            return None if variant else url_for('static', filename=filename, **kwargs)
+        if variant:
+            path = entry['variants'].get(variant)
+            return url_for('assets', filename=path, **kwargs) if path else None
+        return url_for('assets', filename=entry['path'], **kwargs)
+
+    def send(self, filename):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        served = filename
+        encoding = None
+        for candidate, suffix in ENCODINGS:
+            if candidate in self.encodings.get(filename, ()) and request.accept_encodings[candidate]:
+                served, encoding = filename + suffix, candidate
+                break
+
+        response = send_from_directory(self.directory, served, mimetype=mimetype,
+                                       max_age=31536000, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+    # Marks a template to be prerendered by the first request that serves it,
+    # so CLI commands and workers that never serve pages skip the work
+    def defer_prerender(self, template, base_url):
+        self.deferred[template] = base_url
+
+    # Renders a template once, with base_url standing in for the request so
+    # absolute URLs (og:image) point at the public site, and keeps the body,
+    # its compressed copies and their ETags for every later request
+    def prerender(self, app, template, base_url):
+        with app.test_request_context(base_url=base_url):
+            body = render_template(template).encode()
+
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        variants = {None: (body, etag)}
+        for encoding, _ in available_encodings():
+            variants[encoding] = (compress(body, encoding), f"{etag}-{encoding}")
+        self.pages[template] = variants
+        return variants
+
+    def page(self, template):
+        variants = self.pages.get(template)
+        if variants is None and template in self.deferred:
+            # Concurrent first requests may both render; the results are identical
+            variants = self.prerender(current_app._get_current_object(), template,
+                                      self.deferred[template])
+        if variants is None:
+            return render_template(template)
+
+        encoding = next((e for e, _ in ENCODINGS
+                         if e in variants and request.accept_encodings[e]), None)
+        body, etag = variants[encoding]
+
+        response = make_response(body)
+        response.mimetype = 'text/html'
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = PAGE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
+
+
+assets = AssetPipeline()
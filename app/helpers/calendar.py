@@ -0,0 +1,106 @@
+from datetime import timedelta
+from .. import db
+from ..models import EntryCalendarMonth, GratitudeEntry, User
+from .timezones import to_local, local_month_bounds_utc
+from .utils import upsert_insert
+
+
+# Months are stored as year * 100 + month, e.g. 202506
+def month_index(local_date):
+    return local_date.year * 100 + local_date.month
+
+
+def parse_month(value):
+    year, month = value.split('-')
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month: {value}")
+    return year * 100 + month
+
+
+def format_month(index):
+    return f"{index // 100:04d}-{index % 100:02d}"
+
+
+def bitmap_days(bits):
+    return [day for day in range(1, 32) if bits & (1 << (day - 1))]
+
+
+def mark_entry_day(user_id, local_date):
+    bit = 1 << (local_date.day - 1)
+    stmt = upsert_insert(EntryCalendarMonth).values(
+        user_id=user_id, month=month_index(local_date), days=bit)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'month'],
+        set_={'days': EntryCalendarMonth.days.op('|')(bit)})
+    db.session.execute(stmt)
+
+
+def clear_entry_day(user_id, local_date):
+    mask = ~(1 << (local_date.day - 1))
+    EntryCalendarMonth.query.filter_by(
+        user_id=user_id, month=month_index(local_date)
+    ).update({'days': EntryCalendarMonth.days.op('&')(mask)},
+             synchronize_session=False)
+
+
+# Users without any calendar row have not been backfilled yet; their months
+# are computed from the entries instead
+def get_calendar_months(user_id, start_month, end_month):
+    months = EntryCalendarMonth.query.filter(
+        EntryCalendarMonth.user_id == user_id,
+        EntryCalendarMonth.month >= start_month,
+        EntryCalendarMonth.month <= end_month
+    ).order_by(EntryCalendarMonth.month.asc()).all()
+    if months or has_calendar(user_id):
+        return months
+    return entry_months(user_id, start_month, end_month)
+
+
+def has_calendar(user_id):
+    return db.session.query(EntryCalendarMonth.user_id).filter_by(
+        user_id=user_id).first() is not None
+
+
+def month_bitmaps(rows, timezone_name):
+    months = {}
+    for ts_utc, local_date in rows:
+        if local_date is None:
+            local_date = to_local(ts_utc, timezone_name).date()
+        index = month_index(local_date)
+        months[index] = months.get(index, 0) | (1 << (local_date.day - 1))
+    return months
+
+
+# The calendar rows get_calendar_months would return, built from the entries
+# written in that range. Stored local dates can sit a day either side of the
+# timestamp after a timezone change, hence the padding.
+def entry_months(user_id, start_month, end_month):
+    user = db.session.get(User, user_id)
+    if user is None or not user.user_timezone:
+        return []
+
+    start_utc, _ = local_month_bounds_utc(user.user_timezone, start_month // 100, start_month % 100)
+    _, end_utc = local_month_bounds_utc(user.user_timezone, end_month // 100, end_month % 100)
+    rows = db.session.query(GratitudeEntry.timestamp, GratitudeEntry.local_date).filter(
+        GratitudeEntry.user_id == user_id,
+        GratitudeEntry.timestamp >= start_utc - timedelta(days=1),
+        GratitudeEntry.timestamp < end_utc + timedelta(days=1)
+    ).all()
+
+    months = month_bitmaps(rows, user.user_timezone)
+    return [EntryCalendarMonth(user_id=user_id, month=index, days=months[index])
+            for index in sorted(months) if start_month <= index <= end_month]
+
+
+# Recomputes every month from the entries, e.g. after the user's timezone
+# changes. Entries keep the local date they were written on; only rows without
+# one are placed using the current timezone. Does not commit.
+def rebuild_user_calendar(user):
+    rows = db.session.query(GratitudeEntry.timestamp, GratitudeEntry.local_date).filter(
+        GratitudeEntry.user_id == user.user_id).all()
+    months = month_bitmaps(rows, user.user_timezone)
+
+    EntryCalendarMonth.query.filter_by(user_id=user.user_id).delete()
+    db.session.add_all(EntryCalendarMonth(user_id=user.user_id, month=index, days=bits)
+                       for index, bits in months.items())
@@ -0,0 +1,72 @@
+from cryptography.fernet import Fernet
+from functools import lru_cache
+from ..config import Config
+from .metrics import CRYPTO_SECONDS
+import json
+
+ENTRY_FIELDS = ('entry1', 'entry2', 'entry3',
+                'user_prompt', 'user_prompt_response')
+ENTRY_FORMAT_VERSION = "v1"
+
+
+@lru_cache(maxsize=None)
+def get_cipher():
+    return Fernet(Config.ENCRYPTION_KEY)
+
+
+ENCRYPT_SECONDS = CRYPTO_SECONDS.labels('encrypt')
+DECRYPT_SECONDS = CRYPTO_SECONDS.labels('decrypt')
+
+
+def encrypt(text):
+    with ENCRYPT_SECONDS.time():
+        return get_cipher().encrypt(text.encode()).decode()
+
+
+def decrypt(token):
+    with DECRYPT_SECONDS.time():
+        return get_cipher().decrypt(token.encode()).decode()
+
+
+# Entries are stored as one token holding all five fields:
+# "<version>:<fernet token of a JSON array in ENTRY_FIELDS order>".
+def encrypt_entry(data):
+    values = [data[field] for field in ENTRY_FIELDS]
+    plaintext = json.dumps(values, ensure_ascii=False, separators=(',', ':'))
+    return f"{ENTRY_FORMAT_VERSION}:{encrypt(plaintext)}"
+
+
+def decrypt_entry(entry):
+    if entry.payload:
+        version, _, token = entry.payload.partition(':')
+        if version != ENTRY_FORMAT_VERSION:
+            raise ValueError(f"Unknown entry format: {version}")
+        return dict(zip(ENTRY_FIELDS, json.loads(decrypt(token))))
+
+    # Rows written before the single-payload format
+    return {field: decrypt(getattr(entry, field)) for field in ENTRY_FIELDS}
+
+
+def migrate_legacy_entries(batch_size=500):
+    from .. import db
+    from ..models import GratitudeEntry
+
+    migrated = 0
+    last_id = 0
+    while True:
+        entries = GratitudeEntry.query.filter(
+            GratitudeEntry.payload.is_(None),
+            GratitudeEntry.id > last_id
+        ).order_by(GratitudeEntry.id.asc()).limit(batch_size).all()
+
+        if not entries:
+            return migrated
+
+        for entry in entries:
+            entry.payload = encrypt_entry(decrypt_entry(entry))
+            for field in ENTRY_FIELDS:
+                setattr(entry, field, None)
+
+        db.session.commit()
+        migrated += len(entries)
+        last_id = entries[-1].id
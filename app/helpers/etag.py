@@ -0,0 +1,71 @@
+from flask import request, make_response, Response
+from functools import wraps
+from .utils import get_redis
+from .replica import pin_to_primary
+import hashlib
+import time
+import uuid
+
+TIME_BUCKET_SECONDS = 900
+
+
+def version_key(user_id):
+    return f"user_data_version:{user_id}"
+
+
+# The version is an opaque random token rather than a counter so that a key
+# lost to eviction can never hand out a version an old ETag was built from.
+def get_data_version(redis_client, user_id):
+    version = redis_client.get(version_key(user_id))
+    if version is None:
+        redis_client.set(version_key(user_id), uuid.uuid4().hex, nx=True)
+        version = redis_client.get(version_key(user_id))
+    return version.decode()
+
+
+# Called after every write to a user's data
+def bump_data_version(user_id):
+    pin_to_primary(user_id)
+    redis_client = get_redis()
+    if redis_client is None:
+        return
+    try:
+        redis_client.set(version_key(user_id), uuid.uuid4().hex)
+    except Exception:
+        pass
+
+
+# Answers If-None-Match with a 304 before the view runs any SQL or decryption.
+# Must sit below require_auth. Views whose output depends on the current date
+# set vary_by_time so their ETag also rolls over every TIME_BUCKET_SECONDS.
+def conditional_get(vary_by_time=False):
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            redis_client = get_redis()
+            if redis_client is None:
+                return f(*args, **kwargs)
+
+            try:
+                version = get_data_version(redis_client, request.user_id)
+            except Exception:
+                return f(*args, **kwargs)
+
+            parts = [str(request.user_id), version, request.path,
+                     '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))]
+            if vary_by_time:
+                parts.append(str(int(time.time() // TIME_BUCKET_SECONDS)))
+            etag = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
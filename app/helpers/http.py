@@ -0,0 +1,157 @@
+from requests.adapters import HTTPAdapter
+from .metrics import OUTBOUND_SECONDS, OUTBOUND_REQUESTS, CIRCUIT_OPEN
+from urllib3.exceptions import NewConnectionError
+import random
+import re
+import requests
+import threading
+import time
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+# Opens after `failure_threshold` consecutive failures and rejects calls for
+# `reset_timeout` seconds; then a single trial request decides whether it
+# closes again or stays open for another period.
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+# True when the request never reached the host (refused, unresolvable or
+# timed out while connecting), so it is safe to resend even a POST
+def is_connect_error(exc):
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+
+# ReadTimeout -> 'read_timeout', ChunkedEncodingError -> 'chunked_encoding_error'
+def error_outcome(exc):
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', type(exc).__name__).lower()
+
+
+# Keep-alive session for one upstream host with split connect/read timeouts,
+# bounded retries with jittered exponential backoff on connection errors and
+# 429/5xx responses, and a circuit breaker that fails fast while the host is
+# down. Read timeouts are not retried so a slow upstream can't multiply the
+# time a worker is tied up, and non-idempotent requests (Gemini POSTs) are
+# only resent when the connection was never made.
+class HttpClient:
+    def __init__(self, name, connect_timeout=5, read_timeout=30, retries=2,
+                 backoff=0.5, max_backoff=4, pool_maxsize=10,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize,
+                              max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+
+        if not self.breaker.allow():
+            self._record('circuit_open')
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                self._record(error_outcome(e), started)
+                if attempt < self.retries and (idempotent or is_connect_error(e)):
+                    self._sleep(attempt)
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+            except requests.RequestException as e:
+                self._record(error_outcome(e), started)
+                self.breaker.record_failure()
+                raise
+
+            self._record(str(response.status_code), started)
+            if response.status_code in RETRY_STATUSES:
+                if idempotent and attempt < self.retries:
+                    retry_after = response.headers.get('Retry-After')
+                    response.close()
+                    self._sleep(attempt, retry_after)
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    def _sleep(self, attempt, retry_after=None):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        delay = random.uniform(delay / 2, delay)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(int(retry_after), self.max_backoff))
+        time.sleep(delay)
+
+    def _record(self, outcome, started=None):
+        OUTBOUND_REQUESTS.labels(self.name, outcome).inc()
+        if started is not None:
+            OUTBOUND_SECONDS.labels(self.name).observe(
+                time.perf_counter() - started)
+        CIRCUIT_OPEN.labels(self.name).set(1 if self.breaker.is_open else 0)
+
+
+gemini_client = HttpClient('gemini', connect_timeout=5, read_timeout=60,
+                           retries=2, failure_threshold=5, reset_timeout=30)
+apple_client = HttpClient('apple', connect_timeout=3, read_timeout=5,
+                          retries=2, failure_threshold=3, reset_timeout=15)
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from jwt.algorithms import RSAAlgorithm
+from .http import apple_client
+
+REDIS_KEY = "apple_jwks"
+DEFAULT_MAX_AGE = 3600
+MIN_MAX_AGE = 120
+REFRESH_AHEAD = 60
+UNKNOWN_KID_COOLDOWN = 30
+FAILED_FETCH_RETRY = 30
+FETCH_TIMEOUT = 5
+
+
+def parse_max_age(cache_control):
+    for directive in (cache_control or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.lower()
+        if name in ("no-store", "no-cache"):
+            return MIN_MAX_AGE
+        if name == "max-age":
+            try:
+                return max(int(value.strip('"')), MIN_MAX_AGE)
+            except ValueError:
+                pass
+    return DEFAULT_MAX_AGE
+
+
+# Apple signing keys, parsed once and indexed by kid. Each worker keeps its own
+# copy; when Redis is available the raw JWKS document is shared so only one
+# worker per max-age window actually talks to Apple.
+class AppleKeyCache:
+    def __init__(self, url=None):
+        self.url = url
+        self.redis = None
+        self._keys = {}
+        self._expires_at = 0
+        self._refresh_at = 0
+        self._last_forced = 0
+        self._lock = threading.Lock()
+        self._inflight = None
+
+    def init_app(self, app, redis_client=None):
+        self.url = self.url or app.config['APPLE_KEYS_URL']
+        self.redis = redis_client
+        app.extensions['apple_keys'] = self
+
+    def get_key(self, kid):
+        now = time.time()
+        if now >= self._expires_at:
+            self._refresh()
+        elif now >= self._refresh_at:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._allow_forced_refresh():
+            self._refresh(force=True)
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise Exception("No key found with matching kid")
+        return key
+
+    def _allow_forced_refresh(self):
+        with self._lock:
+            now = time.time()
+            if now - self._last_forced < UNKNOWN_KID_COOLDOWN:
+                return False
+            self._last_forced = now
+            return True
+
+    # The in-flight event is claimed under the lock before the thread starts,
+    # so callers racing past _refresh_at start one refresh between them.
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._inflight is not None:
+                return
+            event = self._inflight = threading.Event()
+        thread = threading.Thread(target=self._lead_quietly, args=(event,), daemon=True)
+        thread.start()
+
+    def _lead_quietly(self, event):
+        try:
+            self._lead(event, False)
+        except Exception:
+            pass
+
+    # Concurrent callers share one fetch: the first becomes the leader and the
+    # rest wait on its event instead of issuing their own request.
+    def _refresh(self, force=False):
+        with self._lock:
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+
+        if not leader:
+            event.wait(FETCH_TIMEOUT * 2)
+            return
+        self._lead(event, force)
+
+    def _lead(self, event, force):
+        try:
+            self._load(force)
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def _load(self, force):
+        if not force and self._load_from_redis():
+            return
+
+        try:
+            response = apple_client.get(self.url)
+            if response.status_code != 200:
+                raise Exception("Failed to fetch Apple public keys")
+            document = response.json()
+        except Exception:
+            if not self._keys:
+                raise
+            # Keep serving the keys we have rather than failing every login.
+            self._set_expiry(FAILED_FETCH_RETRY)
+            return
+
+        max_age = parse_max_age(response.headers.get("Cache-Control"))
+        self._install(document, max_age)
+
+        if self.redis is not None:
+            try:
+                self.redis.set(REDIS_KEY, json.dumps(document), ex=max_age)
+            except Exception:
+                pass
+
+    def _load_from_redis(self):
+        if self.redis is None:
+            return False
+        try:
+            pipe = self.redis.pipeline()
+            pipe.get(REDIS_KEY)
+            pipe.ttl(REDIS_KEY)
+            raw, ttl = pipe.execute()
+        except Exception:
+            return False
+
+        if not raw or ttl is None or ttl <= REFRESH_AHEAD:
+            return False
+
+        self._install(json.loads(raw), ttl)
+        return True
+
+    def _install(self, document, max_age):
+        keys = {}
+        for jwk in document.get("keys", []):
+            try:
+                keys[jwk["kid"]] = RSAAlgorithm.from_jwk(json.dumps(jwk))
+            except Exception:
+                continue
+        if not keys:
+            raise Exception("Failed to fetch Apple public keys")
+
+        self._keys = keys
+        self._set_expiry(max_age)
+
+    def _set_expiry(self, max_age):
+        now = time.time()
+        self._expires_at = now + max_age
+        self._refresh_at = self._expires_at - min(REFRESH_AHEAD, max_age // 2)
+
+
+apple_keys = AppleKeyCache()
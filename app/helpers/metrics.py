@@ -0,0 +1,110 @@
+from flask import request, g, has_app_context, Response
+from prometheus_client import (Counter, Histogram, Gauge, CollectorRegistry, REGISTRY,
+                               generate_latest, CONTENT_TYPE_LATEST, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import os
+import time
+
+# With several gunicorn workers, PROMETHEUS_MULTIPROC_DIR must point at a
+# directory shared by all of them (see setup.sh and gunicorn.conf.py); each
+# scrape then aggregates every worker's samples.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+REQUEST_SECONDS = Histogram(
+    'gratefultime_request_seconds', 'HTTP request latency',
+    ['blueprint', 'endpoint', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'gratefultime_db_queries_per_request', 'SQL statements executed per request',
+    ['blueprint', 'endpoint'], buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 50, 100))
+DB_SECONDS = Histogram(
+    'gratefultime_db_seconds_per_request', 'Time spent in SQL per request',
+    ['blueprint', 'endpoint'])
+CRYPTO_SECONDS = Histogram(
+    'gratefultime_crypto_seconds', 'Fernet encrypt/decrypt latency', ['operation'],
+    buckets=(.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .05))
+GEMINI_SECONDS = Histogram(
+    'gratefultime_gemini_seconds', 'Gemini request latency', ['mode'],
+    buckets=(.25, .5, 1, 2.5, 5, 10, 20, 30, 60, 90))
+GEMINI_ERRORS = Counter(
+    'gratefultime_gemini_errors_total', 'Failed Gemini requests', ['mode', 'code'])
+RATE_LIMITED = Counter(
+    'gratefultime_rate_limited_total', 'Requests rejected by the rate limiter', ['endpoint'])
+SUMMARY_CACHE = Counter(
+    'gratefultime_summary_cache_total', 'Monthly summary cache lookups', ['result'])
+OUTBOUND_SECONDS = Histogram(
+    'gratefultime_outbound_seconds', 'Outbound HTTP attempt latency', ['client'],
+    buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 20, 30, 60))
+OUTBOUND_REQUESTS = Counter(
+    'gratefultime_outbound_requests_total', 'Outbound HTTP attempts by outcome',
+    ['client', 'outcome'])
+CIRCUIT_OPEN = Gauge(
+    'gratefultime_circuit_open', 'Whether the circuit breaker for a client is open',
+    ['client'], multiprocess_mode='max')
+REDIS_POOL_IN_USE = Gauge(
+    'gratefultime_redis_pool_in_use', 'Redis connections checked out',
+    multiprocess_mode='livesum')
+REDIS_POOL_MAX = Gauge(
+    'gratefultime_redis_pool_max', 'Redis pool capacity',
+    multiprocess_mode='livesum')
+
+
+def record_gemini(mode, started, error_code=None):
+    GEMINI_SECONDS.labels(mode).observe(time.perf_counter() - started)
+    if error_code is not None:
+        GEMINI_ERRORS.labels(mode, str(error_code)).inc()
+
+
+def gemini_error_code(exc):
+    response = getattr(exc, 'response', None)
+    if response is not None:
+        return response.status_code
+    return type(exc).__name__
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'metrics_started' in g:
+        g.db_queries += 1
+        g.db_seconds += time.perf_counter() - conn.info['query_started']
+
+
+def init_metrics(app):
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_started' not in g:
+            return response
+
+        blueprint = request.blueprint or 'app'
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_SECONDS.labels(blueprint, endpoint, request.method, response.status_code).observe(
+            time.perf_counter() - g.metrics_started)
+        DB_QUERIES.labels(blueprint, endpoint).observe(g.db_queries)
+        DB_SECONDS.labels(blueprint, endpoint).observe(g.db_seconds)
+
+        redis_client = app.extensions.get('redis')
+        pool = getattr(redis_client, 'connection_pool', None)
+        if pool is not None and hasattr(pool, 'pool'):
+            REDIS_POOL_MAX.set(pool.max_connections)
+            REDIS_POOL_IN_USE.set(pool.max_connections - pool.pool.qsize())
+        return response
+
+
+def metrics_response():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,78 @@
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from functools import wraps
+import threading
+import time
+
+REPLICA_BIND = 'replica'
+# Expired pins are swept once the table grows past this many users
+LOCAL_PIN_SWEEP = 1024
+
+_local_pins = {}
+_local_lock = threading.Lock()
+
+
+def pin_key(user_id):
+    return f"replica_pin:{user_id}"
+
+
+# Queries go to the replica engine only inside views marked with read_replica.
+# Flushes always use the primary, so a read-only view that happens to write
+# still writes to the right database.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('use_replica'):
+            engines = current_app.extensions['sqlalchemy'].engines
+            if REPLICA_BIND in engines:
+                return engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Keeps the user's reads on the primary for REPLICA_STICKY_SECONDS after a
+# write, so they never read back a replica that has not caught up yet
+def pin_to_primary(user_id):
+    seconds = current_app.config['REPLICA_STICKY_SECONDS']
+    now = time.time()
+    with _local_lock:
+        if len(_local_pins) >= LOCAL_PIN_SWEEP:
+            for pinned_id in [k for k, until in _local_pins.items() if until <= now]:
+                del _local_pins[pinned_id]
+        _local_pins[user_id] = now + seconds
+
+    redis_client = current_app.extensions.get('redis')
+    if redis_client is None:
+        return
+    try:
+        redis_client.set(pin_key(user_id), 1, ex=seconds)
+    except Exception:
+        pass
+
+
+def is_pinned(user_id):
+    with _local_lock:
+        until = _local_pins.get(user_id)
+        if until is not None and until <= time.time():
+            del _local_pins[user_id]
+            until = None
+    if until is not None:
+        return True
+
+    redis_client = current_app.extensions.get('redis')
+    if redis_client is None:
+        return False
+    try:
+        return bool(redis_client.exists(pin_key(user_id)))
+    except Exception:
+        # Without Redis we cannot tell whether another worker took the write
+        return True
+
+
+# Serves a read-only view from the replica bind when one is configured.
+# Must sit below require_auth.
+def read_replica(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}) and not is_pinned(request.user_id):
+            g.use_replica = True
+        return f(*args, **kwargs)
+    return decorated
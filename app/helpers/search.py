@@ -0,0 +1,110 @@
+from functools import lru_cache
+from sqlalchemy import func, select
+from .. import db
+from ..config import Config
+from ..models import GratitudeEntry, EntrySearchToken
+from .crypto import decrypt_entry
+from .utils import upsert_insert
+import hashlib
+import hmac
+import re
+import unicodedata
+
+SEARCH_FIELDS = ('entry1', 'entry2', 'entry3', 'user_prompt_response')
+WORD_RE = re.compile(r"[^\W_]+")
+MIN_WORD_LENGTH = 2
+MAX_QUERY_WORDS = 8
+STOPWORDS = frozenset(
+    "an and are as at be but by for from had has have he her his in is it its me my "
+    "of on or our she so that the their them they this to was we were with you your".split())
+
+
+# Lowercases, strips accents and folds simple plurals so "Friends" and
+# "friend" share a token. Queries and entries go through the same function.
+def normalize_words(text):
+    text = unicodedata.normalize('NFKD', (text or '').casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    words = set()
+    for word in WORD_RE.findall(text):
+        if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+            word = word[:-1]
+        if len(word) >= MIN_WORD_LENGTH and word not in STOPWORDS:
+            words.add(word)
+    return words
+
+
+@lru_cache(maxsize=1)
+def index_key():
+    if Config.SEARCH_INDEX_KEY:
+        return Config.SEARCH_INDEX_KEY.encode()
+    return hmac.new(Config.ENCRYPTION_KEY.encode(), b"gratefultime search index v1",
+                    hashlib.sha256).digest()
+
+
+# Tokens are keyed per user, so the same word gives unrelated tokens for
+# different users and the table reveals no cross-user word frequencies
+def word_token(user_id, word):
+    return hmac.new(index_key(), f"{user_id}:{word}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def entry_tokens(user_id, fields):
+    words = set()
+    for field in SEARCH_FIELDS:
+        words |= normalize_words(fields.get(field))
+    return {word_token(user_id, word) for word in words}
+
+
+# Adds the entry's words to the index. Safe to repeat. Does not commit.
+def index_entry(user_id, entry_id, fields):
+    tokens = entry_tokens(user_id, fields)
+    if tokens:
+        db.session.execute(upsert_insert(EntrySearchToken).values([
+            {'user_id': user_id, 'token': token, 'entry_id': entry_id} for token in tokens
+        ]).on_conflict_do_nothing())
+
+
+def unindex_entry(user_id, entry_id):
+    EntrySearchToken.query.filter_by(
+        user_id=user_id, entry_id=entry_id).delete(synchronize_session=False)
+
+
+# Query for the user's entries containing every word of `text`, newest
+# first. Raises ValueError when the text has no searchable words or more
+# than MAX_QUERY_WORDS of them. Only the matching rows are loaded, so only
+# they are ever decrypted.
+def search_query(user_id, text):
+    words = sorted(normalize_words(text))
+    if not words:
+        raise ValueError("Search must contain at least one word")
+    if len(words) > MAX_QUERY_WORDS:
+        raise ValueError(f"Search must contain at most {MAX_QUERY_WORDS} words")
+
+    matches = select(EntrySearchToken.entry_id).where(
+        EntrySearchToken.user_id == user_id,
+        EntrySearchToken.token.in_([word_token(user_id, word) for word in words])
+    ).group_by(EntrySearchToken.entry_id).having(func.count() == len(words))
+
+    return GratitudeEntry.query.filter(
+        GratitudeEntry.user_id == user_id,
+        GratitudeEntry.id.in_(matches)
+    ).order_by(GratitudeEntry.timestamp.desc(), GratitudeEntry.id.desc())
+
+
+# Indexes existing entries in id order, committing per batch. Rows already
+# indexed are skipped by the primary key, so it can be re-run at any time.
+def build_search_index(batch_size=500, user_id=None):
+    indexed = 0
+    last_id = 0
+    while True:
+        query = GratitudeEntry.query.filter(GratitudeEntry.id > last_id)
+        if user_id is not None:
+            query = query.filter(GratitudeEntry.user_id == user_id)
+        entries = query.order_by(GratitudeEntry.id.asc()).limit(batch_size).all()
+        if not entries:
+            return indexed
+
+        for entry in entries:
+            index_entry(entry.user_id, entry.id, decrypt_entry(entry))
+        db.session.commit()
+        indexed += len(entries)
+        last_id = entries[-1].id
@@ -0,0 +1,57 @@
+from flask.json.provider import DefaultJSONProvider
+from .crypto import decrypt_entry
+from .utils import format_timestamps
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Flask's JSON provider backed by orjson. Datetimes are passed through to
+# Flask's default handler so they keep their HTTP-date format, and keys stay
+# sorted unless sort_keys is turned off, so responses match the stdlib provider.
+class OrjsonProvider(DefaultJSONProvider):
+    def dumps_bytes(self, obj):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def init_json(app):
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+# Entry rows as sent to clients. decrypt_entry already builds a fresh dict
+# per row, so id and timestamp are added to it in place rather than copied
+# into a second dict, and the timestamps are formatted in one pass.
+def serialize_entries(entries, local_date=False):
+    rows = []
+    for e, timestamp in zip(entries, format_timestamps([e.timestamp for e in entries])):
+        row = decrypt_entry(e)
+        row['id'] = e.id
+        row['timestamp'] = timestamp
+        if local_date:
+            row['local_date'] = e.local_date.isoformat() if e.local_date else None
+        rows.append(row)
+    return rows
+
+
+def serialize_entry(entry):
+    return serialize_entries([entry])[0]
@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+from .. import db
+from ..models import EntryCalendarMonth, UserStats
+from .calendar import bitmap_days
+
+STAT_FIELDS = ('total_days', 'current_streak', 'longest_streak',
+               'longest_streak_end', 'last_entry_date', 'month_counts')
+ONE_DAY = timedelta(days=1)
+
+
+def month_label(day):
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+# Entry days in ascending order, read from the calendar bitmaps (one row per
+# month) rather than from the entries themselves
+def calendar_days(user_id):
+    rows = EntryCalendarMonth.query.filter_by(user_id=user_id).order_by(
+        EntryCalendarMonth.month.asc()).all()
+    for row in rows:
+        for day in bitmap_days(row.days):
+            yield date(row.month // 100, row.month % 100, day)
+
+
+# Full recomputation from ascending, distinct days. current_streak is the run
+# ending at last_entry_date; whether it is still alive depends on today's
+# date and is decided when it is read. Ties keep the earliest longest streak.
+def compute_stats(days):
+    stats = dict.fromkeys(STAT_FIELDS)
+    stats.update(total_days=0, current_streak=0, longest_streak=0, month_counts={})
+
+    previous = None
+    run = 0
+    for day in days:
+        run = run + 1 if previous is not None and day == previous + ONE_DAY else 1
+        if run > stats['longest_streak']:
+            stats['longest_streak'], stats['longest_streak_end'] = run, day
+        label = month_label(day)
+        stats['month_counts'][label] = stats['month_counts'].get(label, 0) + 1
+        stats['total_days'] += 1
+        previous = day
+
+    stats['current_streak'] = run
+    stats['last_entry_date'] = previous
+    return stats
+
+
+# O(1) update for a new entry day. Only days after the last entry can be
+# applied incrementally; returns False when a full recomputation is needed.
+# month_counts is replaced rather than mutated so the JSON column is saved.
+def apply_added_day(stats, day):
+    last = stats.last_entry_date
+    if last is not None and day <= last:
+        return False
+
+    stats.current_streak = stats.current_streak + 1 if last is not None and day == last + ONE_DAY else 1
+    stats.last_entry_date = day
+    if stats.current_streak > stats.longest_streak:
+        stats.longest_streak, stats.longest_streak_end = stats.current_streak, day
+
+    label = month_label(day)
+    stats.month_counts = {**stats.month_counts, label: stats.month_counts.get(label, 0) + 1}
+    stats.total_days += 1
+    return True
+
+
+# O(1) update for a removed entry day when it was the last day of a streak
+# that continues the day before and is not the longest streak. Anything else
+# returns False.
+def apply_removed_day(stats, day):
+    if day != stats.last_entry_date or stats.current_streak < 2 or stats.longest_streak_end == day:
+        return False
+
+    stats.current_streak -= 1
+    stats.last_entry_date = day - ONE_DAY
+
+    label = month_label(day)
+    counts = {**stats.month_counts, label: stats.month_counts.get(label, 0) - 1}
+    if counts[label] <= 0:
+        del counts[label]
+    stats.month_counts = counts
+    stats.total_days -= 1
+    return True
+
+
+def get_stats_row(user_id, for_update=False):
+    return db.session.get(UserStats, user_id, with_for_update=for_update)
+
+
+# Rebuilds the user's row from the calendar, e.g. after a timezone change.
+# Does not commit.
+def recompute_user_stats(user_id):
+    stats = get_stats_row(user_id, for_update=True)
+    if stats is None:
+        stats = UserStats(user_id=user_id)
+        db.session.add(stats)
+    for field, value in compute_stats(calendar_days(user_id)).items():
+        setattr(stats, field, value)
+    return stats
+
+
+# Called after mark_entry_day / clear_entry_day in the same transaction.
+# A missing row is built from the calendar, which migration 0010 backfills
+# before this code serves traffic. Do not commit.
+def record_entry_day(user_id, day):
+    stats = get_stats_row(user_id, for_update=True)
+    if stats is None or not apply_added_day(stats, day):
+        recompute_user_stats(user_id)
+
+
+def remove_entry_day(user_id, day):
+    stats = get_stats_row(user_id, for_update=True)
+    if stats is None or not apply_removed_day(stats, day):
+        recompute_user_stats(user_id)
+
+
+def stats_values(stats):
+    return {field: getattr(stats, field) for field in STAT_FIELDS}
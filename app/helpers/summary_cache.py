@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from ..config import Config
+from .crypto import encrypt, decrypt
+from .utils import get_redis
+from .metrics import SUMMARY_CACHE
+import hashlib
+import threading
+import time
+
+# Bump when the summary prompt changes so stale summaries stop matching
+SUMMARY_CACHE_VERSION = 2
+LOCAL_CACHE_SIZE = 256
+STATS_KEY = "summary_cache:stats"
+
+
+def month_key(local_dt):
+    return local_dt.strftime('%Y-%m')
+
+
+def entries_digest(entries):
+    digest = hashlib.sha256(f"v{SUMMARY_CACHE_VERSION}".encode())
+    for e in entries:
+        digest.update(f"\n{e.id}:{e.timestamp.isoformat()}".encode())
+    return digest.hexdigest()
+
+
+# Generated summaries keyed by (user, local month) and validated against a
+# digest of the month's entry ids and timestamps. Summaries are stored
+# encrypted with the entry key. Redis entries expire after SUMMARY_CACHE_TTL
+# and have their TTL refreshed on every hit; without Redis a bounded
+# in-process LRU is used instead.
+class SummaryCache:
+    def __init__(self):
+        self._local = OrderedDict()
+        self._local_stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _key(self, user_id, month):
+        return f"summary:{user_id}:{month}"
+
+    def get(self, user_id, month, digest):
+        key = self._key(user_id, month)
+        redis_client = get_redis()
+
+        if redis_client is not None:
+            try:
+                stored_digest, token = redis_client.hmget(
+                    key, 'digest', 'summary')
+                hit = stored_digest is not None and stored_digest.decode() == digest
+                SUMMARY_CACHE.labels('hit' if hit else 'miss').inc()
+                pipe = redis_client.pipeline()
+                pipe.hincrby(STATS_KEY, 'hits' if hit else 'misses', 1)
+                if hit:
+                    pipe.expire(key, Config.SUMMARY_CACHE_TTL)
+                pipe.execute()
+                return decrypt(token.decode()) if hit else None
+            except Exception:
+                return None
+
+        with self._lock:
+            cached = self._local.get(key)
+            hit = (cached is not None and cached[0] == digest
+                   and cached[2] > time.time())
+            self._local_stats['hits' if hit else 'misses'] += 1
+            SUMMARY_CACHE.labels('hit' if hit else 'miss').inc()
+            if not hit:
+                return None
+            self._local.move_to_end(key)
+            token = cached[1]
+        return decrypt(token)
+
+    def set(self, user_id, month, digest, summary):
+        key = self._key(user_id, month)
+        token = encrypt(summary)
+        redis_client = get_redis()
+
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline()
+                pipe.hset(key, mapping={'digest': digest, 'summary': token})
+                pipe.expire(key, Config.SUMMARY_CACHE_TTL)
+                pipe.execute()
+            except Exception:
+                pass
+            return
+
+        with self._lock:
+            self._local[key] = (digest, token,
+                                time.time() + Config.SUMMARY_CACHE_TTL)
+            self._local.move_to_end(key)
+            while len(self._local) > LOCAL_CACHE_SIZE:
+                self._local.popitem(last=False)
+
+    def invalidate(self, user_id, month):
+        key = self._key(user_id, month)
+        redis_client = get_redis()
+
+        if redis_client is not None:
+            try:
+                redis_client.delete(key)
+            except Exception:
+                pass
+            return
+
+        with self._lock:
+            self._local.pop(key, None)
+
+    # Partial summaries are content-addressed: the digest covers exactly the
+    # entries that were summarized, so no invalidation is needed
+    def get_partial(self, user_id, digest):
+        key = f"summary_partial:{user_id}:{digest}"
+        redis_client = get_redis()
+
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline()
+                pipe.get(key)
+                pipe.expire(key, Config.SUMMARY_CACHE_TTL)
+                token, _ = pipe.execute()
+                return decrypt(token.decode()) if token else None
+            except Exception:
+                return None
+
+        with self._lock:
+            cached = self._local.get(key)
+            if cached is None or cached[2] <= time.time():
+                return None
+            self._local.move_to_end(key)
+            token = cached[1]
+        return decrypt(token)
+
+    def set_partial(self, user_id, digest, summary):
+        key = f"summary_partial:{user_id}:{digest}"
+        token = encrypt(summary)
+        redis_client = get_redis()
+
+        if redis_client is not None:
+            try:
+                redis_client.set(key, token, ex=Config.SUMMARY_CACHE_TTL)
+            except Exception:
+                pass
+            return
+
+        with self._lock:
+            self._local[key] = (digest, token,
+                                time.time() + Config.SUMMARY_CACHE_TTL)
+            self._local.move_to_end(key)
+            while len(self._local) > LOCAL_CACHE_SIZE:
+                self._local.popitem(last=False)
+
+    def stats(self):
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                raw = redis_client.hgetall(STATS_KEY)
+                return {
+                    'hits': int(raw.get(b'hits', 0)),
+                    'misses': int(raw.get(b'misses', 0))
+                }
+            except Exception:
+                pass
+
+        with self._lock:
+            return dict(self._local_stats)
+
+
+summary_cache = SummaryCache()
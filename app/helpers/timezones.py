@@ -0,0 +1,52 @@
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import pytz
+
+# Same names the API has always accepted, as a set for O(1) membership checks
+VALID_TIMEZONES = frozenset(pytz.all_timezones)
+
+
+def is_valid_timezone(name):
+    return name in VALID_TIMEZONES
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    if name not in VALID_TIMEZONES:
+        raise ValueError(f"Invalid timezone: {name}")
+    return ZoneInfo(name)
+
+
+def to_local(utc_dt, name):
+    if utc_dt.tzinfo is None:
+        utc_dt = utc_dt.replace(tzinfo=timezone.utc)
+    return utc_dt.astimezone(get_zone(name))
+
+
+def local_now(name):
+    return datetime.now(timezone.utc).astimezone(get_zone(name))
+
+
+def local_today(name):
+    return local_now(name).date()
+
+
+# UTC instants of local midnight at the start and end of `day`. Building the
+# local datetime from scratch lets zoneinfo pick the offset in effect on that
+# date, so days and months that cross a DST change get the right bounds.
+@lru_cache(maxsize=4096)
+def local_day_bounds_utc(name, day):
+    zone = get_zone(name)
+    start = datetime.combine(day, time(), tzinfo=zone)
+    end = datetime.combine(day + timedelta(days=1), time(), tzinfo=zone)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def local_month_bounds_utc(name, year, month):
+    zone = get_zone(name)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    start = datetime(year, month, 1, tzinfo=zone)
+    end = datetime(next_year, next_month, 1, tzinfo=zone)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
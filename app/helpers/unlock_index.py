@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from sqlalchemy import func, or_, update
+from .. import db
+from ..models import User
+from .timezones import get_zone, is_valid_timezone
+
+DEFAULT_UNLOCK_HOUR = 20
+MINUTES_PER_DAY = 1440
+
+
+def utc_offset_minutes(name, at=None):
+    at = at or datetime.now(timezone.utc)
+    return int(at.astimezone(get_zone(name)).utcoffset().total_seconds() // 60)
+
+
+# Minute of the UTC day at which local `unlock_hour` currently falls in
+# `name`. Only valid until the zone's next offset change; the scheduler
+# recomputes affected rows when that happens.
+def unlock_utc_minute(name, unlock_hour, at=None):
+    return (unlock_hour * 60 - utc_offset_minutes(name, at)) % MINUTES_PER_DAY
+
+
+def set_unlock_minute(user):
+    hour = user.preferred_unlock_time
+    if hour is None:
+        hour = DEFAULT_UNLOCK_HOUR
+    user.unlock_utc_minute = unlock_utc_minute(user.user_timezone, hour) \
+        if user.user_timezone and is_valid_timezone(user.user_timezone) else None
+
+
+def indexed_zones():
+    return [name for (name,) in db.session.query(User.user_timezone).distinct()
+            if name and is_valid_timezone(name)]
+
+
+# Recomputes unlock_utc_minute for every user in `zones` with one UPDATE per
+# zone, touching only rows whose minute actually changed. Cost grows with the
+# number of zones, not users. Returns the number of rows updated.
+def refresh_unlock_index(zones=None, at=None):
+    at = at or datetime.now(timezone.utc)
+    updated = 0
+    for name in indexed_zones() if zones is None else zones:
+        offset = utc_offset_minutes(name, at)
+        hour = func.coalesce(User.preferred_unlock_time, DEFAULT_UNLOCK_HOUR)
+        # Shifted positive before the modulo so Postgres and SQLite agree
+        minute = (hour * 60 - offset + 2 * MINUTES_PER_DAY) % MINUTES_PER_DAY
+        result = db.session.execute(
+            update(User)
+            .where(User.user_timezone == name,
+                   User.account_active.isnot(False),
+                   or_(User.unlock_utc_minute.is_(None), User.unlock_utc_minute != minute))
+            .values(unlock_utc_minute=minute)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    db.session.commit()
+    return updated
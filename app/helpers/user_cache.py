@@ -0,0 +1,75 @@
+from flask import current_app
+from .. import db
+from ..models import User
+import json
+import threading
+import time
+
+USER_CACHE_TTL = 30
+CACHED_FIELDS = ('user_id', 'user_timezone',
+                 'preferred_unlock_time', 'account_active')
+
+_local = {}
+_lock = threading.Lock()
+
+
+def cache_key(user_id):
+    return f"user_cache:{user_id}"
+
+
+def _redis():
+    return current_app.extensions.get('redis')
+
+
+# Read-only snapshot of the columns request handlers need. The returned User
+# is never attached to the session; load the row with User.query to modify it.
+def get_cached_user(user_id):
+    fields = _read(user_id)
+    if fields is None:
+        user = db.session.query(User).filter_by(user_id=user_id).first()
+        if not user:
+            return None
+        fields = {field: getattr(user, field) for field in CACHED_FIELDS}
+        _write(user_id, fields)
+    return User(**fields)
+
+
+def invalidate_user(user_id):
+    redis_client = _redis()
+    if redis_client is not None:
+        try:
+            redis_client.delete(cache_key(user_id))
+        except Exception:
+            pass
+    with _lock:
+        _local.pop(user_id, None)
+
+
+def _read(user_id):
+    redis_client = _redis()
+    if redis_client is not None:
+        try:
+            raw = redis_client.get(cache_key(user_id))
+            return json.loads(raw) if raw else None
+        except Exception:
+            return None
+
+    with _lock:
+        cached = _local.get(user_id)
+    if cached and cached[1] > time.time():
+        return cached[0]
+    return None
+
+
+def _write(user_id, fields):
+    redis_client = _redis()
+    if redis_client is not None:
+        try:
+            redis_client.set(cache_key(user_id), json.dumps(
+                fields), ex=USER_CACHE_TTL)
+        except Exception:
+            pass
+        return
+
+    with _lock:
+        _local[user_id] = (fields, time.time() + USER_CACHE_TTL)
@@ -1,19 +1,55 @@
 import jwt
-import requests
-from flask import request, jsonify
+from flask import request, jsonify, current_app, g
 from functools import wraps
-from jwt.algorithms import RSAAlgorithm
 from jwt import get_unverified_header
 from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from .. import db
 from ..config import Config
 from ..models import User
+from .jwks import apple_keys
+from .user_cache import get_cached_user
 import datetime
-import pytz
-import json
+import base64
 
 
+# Timestamps are stored as UTC. isoformat is several times faster than
+# strftime; aware values are formatted by their wall time, as strftime did.
 def format_timestamp(timestamp):
-    return timestamp.strftime('%Y-%m-%d %H:%M:%S') + "+00:00"
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.replace(tzinfo=None)
+    return timestamp.isoformat(' ', 'seconds') + "+00:00"
+
+
+def format_timestamps(timestamps):
+    return [format_timestamp(t) for t in timestamps]
+
+
+# INSERT ... ON CONFLICT for the bound database. Production runs on Postgres;
+# SQLite is supported so the benchmark suite can run without a server.
+def upsert_insert(model):
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def get_redis():
+    return current_app.extensions.get('redis')
+
+
+def encode_cursor(timestamp, entry_id):
+    raw = f"{timestamp.isoformat()}|{entry_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, entry_id = raw.rsplit('|', 1)
+        return datetime.datetime.fromisoformat(timestamp), int(entry_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 
 def encode_token(user_id):
@@ -33,16 +69,33 @@ def is_email_taken(email):
     return User.query.filter(func.lower(User.email) == email.lower()).first()
 
 
-def require_auth(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
+# Decodes the bearer token once per request; the rate limiter key and
+# require_auth both read from here. Returns (token_present, user_id).
+def get_auth_context():
+    if 'auth_context' not in g:
         token = request.headers.get('Authorization', None)
         if token and token.startswith("Bearer "):
-            token = token.split(" ")[1]
+            g.auth_context = (True, decode_token(token.split(" ")[1]))
         else:
+            g.auth_context = (False, None)
+    return g.auth_context
+
+
+# The authenticated user, loaded at most once per request through the user cache
+def get_current_user():
+    if 'current_user' not in g:
+        _, user_id = get_auth_context()
+        g.current_user = get_cached_user(user_id) if user_id else None
+    return g.current_user
+
+
+def require_auth(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token_present, user_id = get_auth_context()
+        if not token_present:
             return jsonify({'message': 'Missing or invalid token'}), 401
 
-        user_id = decode_token(token)
         if not user_id:
             return jsonify({'message': 'Invalid or expired token'}), 401
 
@@ -52,17 +105,7 @@ def require_auth(f):
 
 
 def get_public_key_from_apple(kid):
-    response = requests.get(Config.APPLE_KEYS_URL)
-    if response.status_code != 200:
-        raise Exception("Failed to fetch Apple public keys")
-
-    keys = response.json().get("keys", [])
-    key = next((k for k in keys if k["kid"] == kid), None)
-    if not key:
-        raise Exception("No key found with matching kid")
-
-    key_json = json.dumps(key)
-    return RSAAlgorithm.from_jwk(key_json)
+    return apple_keys.get_key(kid)
 
 
 def verify_apple_token(identity_token):
@@ -79,13 +122,3 @@ def verify_apple_token(identity_token):
         issuer=Config.APPLE_ISSUER,
         leeway=datetime.timedelta(seconds=300)
     )
-
-
-def convert_utc_to_local(utc_dt, timezone_str):
-    if timezone_str not in pytz.all_timezones:
-        raise ValueError(f"Invalid timezone: {timezone_str}")
-
-    local_tz = pytz.timezone(timezone_str)
-    utc_dt = utc_dt.replace(tzinfo=pytz.utc)
-    local_dt = utc_dt.astimezone(local_tz)
-    return local_dt
@@ -1,4 +1,5 @@
 from . import db
+from sqlalchemy import func
 from datetime import datetime, timezone
 
 
@@ -9,6 +10,9 @@ class User(db.Model):
     user_timezone = db.Column(db.String(64), default="America/New_York")
     apple_user_id = db.Column(db.String(255), unique=True, nullable=True)
     preferred_unlock_time = db.Column(db.Integer, default=20)
+    # UTC minute of day (0-1439) of the user's unlock time at the current
+    # offset of their timezone; maintained by helpers/unlock_index.py
+    unlock_utc_minute = db.Column(db.SmallInteger, nullable=True, index=True)
     account_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(
         db.DateTime(timezone=True),
@@ -19,12 +23,56 @@ class User(db.Model):
 class GratitudeEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
-    entry1 = db.Column(db.String(255), nullable=False)
-    entry2 = db.Column(db.String(255), nullable=False)
-    entry3 = db.Column(db.String(255), nullable=False)
-    user_prompt = db.Column(db.String(255), nullable=False)
-    user_prompt_response = db.Column(db.String(255), nullable=False)
+    entry1 = db.Column(db.String(255), nullable=True)
+    entry2 = db.Column(db.String(255), nullable=True)
+    entry3 = db.Column(db.String(255), nullable=True)
+    user_prompt = db.Column(db.String(255), nullable=True)
+    user_prompt_response = db.Column(db.String(255), nullable=True)
+    payload = db.Column(db.Text, nullable=True)
     timestamp = db.Column(
         db.DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc)
     )
+    local_date = db.Column(db.Date, nullable=True)
+    idempotency_key = db.Column(db.String(64), nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'local_date',
+                            name='uq_gratitude_entry_user_local_date'),
+        db.UniqueConstraint('user_id', 'idempotency_key',
+                            name='uq_gratitude_entry_user_idempotency_key'),
+    )
+
+
+# One row per user and local month; bit (day - 1) of `days` is set when the
+# user has an entry on that local date
+class EntryCalendarMonth(db.Model):
+    user_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    days = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Streak and count aggregates per user, kept up to date on every entry write
+# so reading stats never scans history (see helpers/stats.py)
+class UserStats(db.Model):
+    user_id = db.Column(db.Integer, primary_key=True)
+    total_days = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak_end = db.Column(db.Date, nullable=True)
+    last_entry_date = db.Column(db.Date, nullable=True)
+    month_counts = db.Column(db.JSON, nullable=False, default=dict)
+
+
+# Blind keyword index: one row per distinct normalized word of an entry,
+# stored only as a keyed HMAC (see helpers/search.py)
+class EntrySearchToken(db.Model):
+    user_id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(32), primary_key=True)
+    entry_id = db.Column(db.Integer, primary_key=True)
+
+
+db.Index('ix_user_email_lower', func.lower(User.email))
+db.Index('ix_gratitude_entry_user_id_timestamp',
+         GratitudeEntry.user_id, GratitudeEntry.timestamp.desc())
+db.Index('ix_entry_search_token_entry_id', EntrySearchToken.entry_id)
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta, timezone
+from .. import db
+from ..config import Config
+from ..models import User, GratitudeEntry
+from ..helpers.timezones import get_zone
+from ..helpers.unlock_index import (DEFAULT_UNLOCK_HOUR, indexed_zones, refresh_unlock_index,
+                                    utc_offset_minutes)
+import logging
+import time
+
+TICK_KEY_TTL = 2 * 3600
+SENT_KEY_TTL = 2 * 24 * 3600
+MAX_CATCH_UP_MINUTES = 5
+ZONE_RELOAD_TICKS = 60
+
+logger = logging.getLogger(__name__)
+
+
+def tick_key(minute):
+    return f"reminder_tick:{int(minute.timestamp()) // 60}"
+
+
+def sent_key(user_id, local_date):
+    return f"reminder_sent:{user_id}:{local_date}"
+
+
+def floor_minute(dt):
+    return dt.replace(second=0, microsecond=0)
+
+
+# Follows the UTC offset of every zone in use. When a zone crosses a DST
+# transition only that zone's users are re-indexed, so the unlock index is
+# correct by the next tick without a full rebuild.
+class OffsetTracker:
+    def __init__(self):
+        self.offsets = {}
+        self.ticks = 0
+
+    def start(self, at):
+        refresh_unlock_index(at=at)
+        self.offsets = {name: utc_offset_minutes(name, at) for name in indexed_zones()}
+
+    def check(self, at):
+        self.ticks += 1
+        if self.ticks % ZONE_RELOAD_TICKS == 0:
+            for name in indexed_zones():
+                self.offsets.setdefault(name, utc_offset_minutes(name, at))
+
+        changed = {name: offset for name, offset in
+                   ((name, utc_offset_minutes(name, at)) for name in self.offsets)
+                   if offset != self.offsets[name]}
+        if changed:
+            updated = refresh_unlock_index(list(changed), at)
+            self.offsets.update(changed)
+            logger.info("Offset change in %s: re-indexed %d users",
+                        ", ".join(sorted(changed)), updated)
+
+
+# Users whose unlock time falls on `minute` and who have no entry for their
+# current local date. Runs one indexed lookup for the minute and one entry
+# lookup per batch, so the cost follows the number of users due.
+def due_batches(minute, batch_size):
+    users = db.session.query(
+        User.user_id, User.user_timezone, User.preferred_unlock_time
+    ).filter(
+        User.unlock_utc_minute == (minute.hour * 60 + minute.minute),
+        User.account_active.isnot(False)
+    ).order_by(User.user_id).all()
+
+    for i in range(0, len(users), batch_size):
+        chunk = users[i:i + batch_size]
+        local_dates = {u.user_id: minute.astimezone(get_zone(u.user_timezone)).date()
+                       for u in chunk}
+
+        posted = {(row.user_id, row.local_date) for row in db.session.query(
+            GratitudeEntry.user_id, GratitudeEntry.local_date
+        ).filter(
+            GratitudeEntry.user_id.in_(list(local_dates)),
+            GratitudeEntry.local_date.in_(list(set(local_dates.values())))
+        )}
+
+        batch = [{
+            'user_id': u.user_id,
+            'user_timezone': u.user_timezone,
+            'unlock_hour': DEFAULT_UNLOCK_HOUR if u.preferred_unlock_time is None else u.preferred_unlock_time,
+            'local_date': local_dates[u.user_id].isoformat()
+        } for u in chunk if (u.user_id, local_dates[u.user_id]) not in posted]
+        if batch:
+            yield batch
+
+
+# Drops reminders already sent for that local date. Around a DST change a
+# user's unlock minute can come round twice in one local day.
+def unsent(redis_client, batch):
+    if redis_client is None:
+        return batch
+    try:
+        pipe = redis_client.pipeline()
+        for reminder in batch:
+            pipe.set(sent_key(reminder['user_id'], reminder['local_date']),
+                     1, nx=True, ex=SENT_KEY_TTL)
+        return [reminder for reminder, fresh in zip(batch, pipe.execute()) if fresh]
+    except Exception:
+        return batch
+
+
+# Emits every batch due at `minute`. With Redis, only the first scheduler to
+# claim a minute processes it, so several instances can run side by side.
+# Returns the number of reminders sent, or None when another instance has it.
+def run_tick(redis_client, sink, minute, batch_size):
+    if redis_client is not None:
+        try:
+            if not redis_client.set(tick_key(minute), 1, nx=True, ex=TICK_KEY_TTL):
+                return None
+        except Exception:
+            pass
+
+    sent = 0
+    for batch in due_batches(minute, batch_size):
+        batch = unsent(redis_client, batch)
+        if batch:
+            sink.send(minute, batch)
+            sent += len(batch)
+    return sent
+
+
+def run_scheduler(app, sink, once=False):
+    batch_size = Config.REMINDER_BATCH_SIZE
+    with app.app_context():
+        redis_client = app.extensions.get('redis')
+        tracker = OffsetTracker()
+        next_minute = floor_minute(datetime.now(timezone.utc))
+        tracker.start(next_minute)
+
+        while True:
+            now = datetime.now(timezone.utc)
+            if now < next_minute:
+                time.sleep((next_minute - now).total_seconds())
+                continue
+
+            # After a stall, catch up on recent minutes only
+            earliest = floor_minute(now) - timedelta(minutes=MAX_CATCH_UP_MINUTES - 1)
+            next_minute = max(next_minute, earliest)
+
+            tracker.check(next_minute)
+            sent = run_tick(redis_client, sink, next_minute, batch_size)
+            if sent:
+                logger.info("%s UTC: sent %d reminders", f"{next_minute:%H:%M}", sent)
+            db.session.remove()
+
+            if once:
+                return
+            next_minute += timedelta(minutes=1)
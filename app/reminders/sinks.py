@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Sinks receive each batch of due reminders as a list of dicts with user_id,
+# user_timezone, unlock_hour and local_date. A push-notification sender only
+# needs to provide the same send(minute, batch) method.
+class LogSink:
+    def send(self, minute, batch):
+        logger.info("%s UTC: %d reminders (users %s..%s)", f"{minute:%Y-%m-%d %H:%M}",
+                    len(batch), batch[0]['user_id'], batch[-1]['user_id'])
+
+
+class JsonlSink:
+    def __init__(self, path='reminders.jsonl'):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, minute, batch):
+        emitted_at = datetime.now(timezone.utc).isoformat()
+        lines = ''.join(json.dumps({**reminder, 'minute': minute.isoformat(),
+                                    'emitted_at': emitted_at}) + '\n'
+                        for reminder in batch)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+
+SINKS = {
+    'log': LogSink,
+    'jsonl': JsonlSink
+}
+
+
+# 'log' or 'jsonl:/path/to/file.jsonl'
+def get_sink(spec):
+    name, _, arg = spec.partition(':')
+    if name not in SINKS:
+        raise ValueError(f"Unknown reminder sink: {name}")
+    return SINKS[name](arg) if arg else SINKS[name]()
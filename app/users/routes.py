@@ -1,8 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, abort
 from .. import db
-from ..models import User, GratitudeEntry
-from ..helpers.utils import require_auth, format_timestamp
-import pytz
+from ..models import User, GratitudeEntry, EntryCalendarMonth, UserStats, EntrySearchToken
+from ..helpers.utils import require_auth, get_current_user, format_timestamp
+from ..helpers.stats import recompute_user_stats, get_stats_row, stats_values, compute_stats, calendar_days
+from ..helpers.user_cache import invalidate_user
+from ..helpers.timezones import is_valid_timezone, local_today
+from ..helpers.calendar import rebuild_user_calendar
+from ..helpers.unlock_index import set_unlock_minute
+from ..helpers.replica import read_replica
+from ..helpers.etag import conditional_get, bump_data_version
 
 users_bp = Blueprint('users', __name__)
 
@@ -10,6 +16,8 @@ users_bp = Blueprint('users', __name__)
 # GET MOST RECENT ENTRY TIMESTAMP
 @users_bp.route('/recententrytimestamp', methods=['GET'])
 @require_auth
+@conditional_get()
+@read_replica
 def get_recent_entry():
     entry = (GratitudeEntry.query
              .filter_by(user_id=request.user_id)
@@ -30,8 +38,12 @@ def get_recent_entry():
 # GET USER INFO
 @users_bp.route('/info', methods=['GET'])
 @require_auth
+@conditional_get()
+@read_replica
 def get_user_info():
-    user = User.query.get_or_404(request.user_id)
+    user = get_current_user()
+    if not user:
+        abort(404)
 
     return jsonify({
         'message': 'User information retrieved successfully',
@@ -43,6 +55,42 @@ def get_user_info():
     })
 
 
+# GET STREAKS AND ENTRY COUNTS FROM THE USER'S STATS ROW
+@users_bp.route('/stats', methods=['GET'])
+@require_auth
+@conditional_get(vary_by_time=True)
+@read_replica
+def get_user_stats():
+    user = get_current_user()
+    if not user or not user.user_timezone:
+        return jsonify({'message': 'User or timezone not found'}), 404
+
+    try:
+        today = local_today(user.user_timezone)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Users not yet covered by `flask backfill-stats` are computed on the fly
+    stats = get_stats_row(request.user_id)
+    values = stats_values(stats) if stats else compute_stats(calendar_days(request.user_id))
+
+    # The streak is still alive until a full local day passes without an entry
+    last = values['last_entry_date']
+    alive = last is not None and (today - last).days <= 1
+
+    return jsonify({
+        'message': 'User stats retrieved',
+        'data': {
+            'current_streak': values['current_streak'] if alive else 0,
+            'longest_streak': values['longest_streak'],
+            'longest_streak_end': values['longest_streak_end'].isoformat() if values['longest_streak_end'] else None,
+            'last_entry_date': last.isoformat() if last else None,
+            'total_days': values['total_days'],
+            'month_counts': values['month_counts']
+        }
+    })
+
+
 # UPDATE USER SETTINGS
 @users_bp.route('/settings', methods=['POST'])
 @require_auth
@@ -62,12 +110,19 @@ def update_user_settings():
 
     if 'user_timezone' in data:
         tz = data['user_timezone']
-        if tz in pytz.all_timezones:
+        if is_valid_timezone(tz):
+            timezone_changed = tz != user.user_timezone
             user.user_timezone = tz
+            if timezone_changed:
+                rebuild_user_calendar(user)
+                recompute_user_stats(user.user_id)
         else:
             return jsonify({'message': 'Invalid time zone', 'errorCode': 'timezone'}), 400
 
+    set_unlock_minute(user)
     db.session.commit()
+    invalidate_user(request.user_id)
+    bump_data_version(request.user_id)
 
     return jsonify({
         'message': 'User settings updated successfully',
@@ -84,10 +139,16 @@ def delete_account():
     user = User.query.get_or_404(request.user_id)
     user.preferred_unlock_time = 20
     user.account_active = False
+    user.unlock_utc_minute = None
 
     GratitudeEntry.query.filter_by(user_id=request.user_id).delete()
+    EntryCalendarMonth.query.filter_by(user_id=request.user_id).delete()
+    UserStats.query.filter_by(user_id=request.user_id).delete()
+    EntrySearchToken.query.filter_by(user_id=request.user_id).delete()
 
     db.session.commit()
+    invalidate_user(request.user_id)
+    bump_data_version(request.user_id)
 
     return jsonify({
         'message': 'Goodbye'
@@ -0,0 +1,188 @@
+# Micro-benchmarks for hot helpers that do not need the full app running.
+#
+#   python -m bench.micro
+from cryptography.fernet import Fernet
+import json
+import os
+import random
+import sys
+import timeit
+
+os.environ.setdefault('ENCRYPTION_KEY', Fernet.generate_key().decode())
+for name in ('SECRET_KEY', 'GEMINI_API_KEY', 'REDIS_URL', 'SQLALCHEMY_DATABASE_URI'):
+    os.environ.setdefault(name, 'bench')
+
+
+class Row:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def report(name, seconds, number, unit="op"):
+    print(f"{name:48} {seconds / number * 1e6:10.1f} us/{unit}")
+
+
+# Decrypt cost for a 10-entry page: five legacy Fernet tokens per row versus
+# one single-payload token per row
+def bench_entry_decrypt(number=200):
+    from app.helpers.crypto import encrypt, encrypt_entry, decrypt_entry, ENTRY_FIELDS
+
+    fields = {f: f"Something I was grateful for ({f})" for f in ENTRY_FIELDS}
+    legacy = [Row(payload=None, **{f: encrypt(v) for f, v in fields.items()})
+              for _ in range(10)]
+    single = [Row(payload=encrypt_entry(fields), **dict.fromkeys(ENTRY_FIELDS))
+              for _ in range(10)]
+
+    for label, rows in (("decrypt page (legacy, 5 tokens/row)", legacy),
+                        ("decrypt page (v1 payload, 1 token/row)", single)):
+        seconds = timeit.timeit(lambda: [decrypt_entry(r) for r in rows], number=number)
+        report(label, seconds, number, "page")
+
+
+WORDS = ("coffee with my sister quiet morning walk the dog a good book finished the "
+         "project on time my team laughed at lunch sunshine after rain called mom "
+         "fresh bread kind stranger helped me slept well").split()
+PROMPTS = ["What made you smile today?", "Who helped you this week?",
+           "What are you looking forward to?", None]
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+# (entry id, fields) rows for a synthetic month, oldest first; long_answers
+# makes the prompt responses several times longer than typical
+def sample_month(rng, days, long_answers=False):
+    rows = []
+    for day in range(days):
+        prompt = rng.choice(PROMPTS)
+        rows.append((1000 + day, {
+            'entry1': sentence(rng, 3, 12),
+            'entry2': sentence(rng, 3, 12),
+            'entry3': sentence(rng, 3, 12),
+            'user_prompt': prompt,
+            'user_prompt_response': sentence(rng, 60, 120) if long_answers and prompt
+            else sentence(rng, 5, 25) if prompt else None,
+        }))
+    return rows
+
+
+# The indented-JSON encoding prompts used before the compact one
+def json_encoding(rows):
+    return json.dumps([{
+        "id": entry_id,
+        "gratitude_1": fields['entry1'],
+        "gratitude_2": fields['entry2'],
+        "gratitude_3": fields['entry3'],
+        "user_prompt": fields['user_prompt'],
+        "user_response": fields['user_prompt_response'],
+    } for entry_id, fields in rows], ensure_ascii=False, indent=2)
+
+
+# Prompt size for synthetic months: the previous indented-JSON encoding
+# versus the compact line encoding, plus how often the budget kicks in
+def bench_prompt_tokens(number=200):
+    from app.ai.prompt import encode_entries, estimate_tokens
+
+    rng = random.Random(19)
+    for label, rows in (("typical month (30 entries)", sample_month(rng, 30)),
+                        ("verbose month (31 entries)", sample_month(rng, 31, True))):
+        before = estimate_tokens(json_encoding(rows))
+        after = estimate_tokens(encode_entries(rows, budget=10 ** 9))
+        print(f"{'tokens, ' + label:48} {before:8} json -> {after:6} compact "
+              f"({100 * (before - after) / before:.0f}% fewer)")
+        budgeted = encode_entries(rows, budget=2000)
+        header = budgeted.splitlines()[0]
+        print(f"{'  with a 2000 token budget':48} {estimate_tokens(budgeted):8} tokens, "
+              f"{header if header.startswith('(') else 'all entries shown'}")
+        seconds = timeit.timeit(lambda: encode_entries(rows, budget=2000), number=number)
+        report("  encode with budget", seconds, number, "month")
+
+
+# Response encoding for entry pages: Flask's stdlib provider versus the
+# orjson provider (when installed), and strftime timestamps versus the
+# batched isoformat formatter. Decryption is measured by bench_entry_decrypt.
+def bench_json_encoders(number=50):
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from app.helpers.crypto import ENTRY_FIELDS
+    from app.helpers.serialize import OrjsonProvider, orjson
+    from app.helpers.utils import format_timestamps
+    from datetime import datetime, timedelta
+
+    app = Flask('bench')
+    encoders = [("stdlib", DefaultJSONProvider(app))]
+    if orjson is not None:
+        encoders.append(("orjson", OrjsonProvider(app)))
+    else:
+        print("orjson is not installed; only the stdlib provider is measured")
+
+    start = datetime(2024, 1, 1, 21, 30)
+    for size in (10, 100, 1000):
+        timestamps = [start + timedelta(days=i) for i in range(size)]
+        runs = max(number * 100 // size, 10)
+
+        seconds = timeit.timeit(lambda: [t.strftime('%Y-%m-%d %H:%M:%S') + "+00:00"
+                                         for t in timestamps], number=runs)
+        report(f"timestamps strftime, {size} entries", seconds, runs, "page")
+        seconds = timeit.timeit(lambda: format_timestamps(timestamps), number=runs)
+        report(f"timestamps format_timestamps, {size} entries", seconds, runs, "page")
+
+        rows = [{'id': i, **{f: f"Something I was grateful for ({f})" for f in ENTRY_FIELDS},
+                 'timestamp': t} for i, t in enumerate(format_timestamps(timestamps))]
+        for name, provider in encoders:
+            seconds = timeit.timeit(lambda: provider.dumps({'data': rows}), number=runs)
+            report(f"encode {name}, {size} entries", seconds, runs, "page")
+
+
+# Incremental stats updates against a full recomputation over three years of
+# history. Their equivalence is checked by the property test in
+# tests/test_stats.py.
+def bench_stats_updates(number=2000):
+    from app.helpers.stats import compute_stats, apply_added_day, apply_removed_day
+    from datetime import date, timedelta
+
+    history = [date(2021, 1, 1) + timedelta(days=i) for i in range(3 * 365) if i % 9]
+    stats = Row(**compute_stats(history))
+    next_day = history[-1] + timedelta(days=1)
+
+    def add_and_remove():
+        apply_added_day(stats, next_day)
+        apply_added_day(stats, next_day + timedelta(days=1))
+        apply_removed_day(stats, next_day + timedelta(days=1))
+        apply_removed_day(stats, next_day)
+
+    seconds = timeit.timeit(add_and_remove, number=number)
+    report("stats incremental update", seconds, number * 4, "update")
+    seconds = timeit.timeit(lambda: compute_stats(history), number=number // 20)
+    report(f"stats full recompute ({len(history)} days)", seconds, number // 20, "update")
+
+
+# Timezone validation: membership in pytz.all_timezones (a list, scanned
+# front to back) versus the VALID_TIMEZONES frozenset, for a name early in
+# the list, one near the end and an invalid one that scans the whole list
+def bench_timezone_lookup(number=20000):
+    from app.helpers.timezones import VALID_TIMEZONES
+    import pytz
+
+    all_timezones = pytz.all_timezones
+    for name in ("America/New_York", "Pacific/Kiritimati", "Mars/Olympus_Mons"):
+        assert (name in all_timezones) == (name in VALID_TIMEZONES)
+        seconds = timeit.timeit(lambda: name in all_timezones, number=number)
+        report(f"timezone lookup, list ({name})", seconds, number, "lookup")
+        seconds = timeit.timeit(lambda: name in VALID_TIMEZONES, number=number)
+        report(f"timezone lookup, frozenset ({name})", seconds, number, "lookup")
+
+
+BENCHMARKS = [bench_entry_decrypt, bench_prompt_tokens, bench_json_encoders, bench_stats_updates,
+              bench_timezone_lookup]
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for benchmark in BENCHMARKS:
+        benchmark()
+
+
+if __name__ == '__main__':
+    main()
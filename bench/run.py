@@ -0,0 +1,368 @@
+# Boots create_app() against a local database, Redis (or fakeredis) and stub
+# Apple/Gemini servers, seeds synthetic users with years of encrypted entries
+# and reports latency percentiles and throughput for every API endpoint.
+#
+#   python -m bench.run                                   # SQLite + local Redis
+#   python -m bench.run --database-url postgresql://localhost/gt_bench
+#   python -m bench.run --fakeredis --output results.json
+#   python -m bench.run --compare results.json --threshold 0.15
+#   python -m bench.run --years 5 --only entries.search entries.search_scan
+#   python -m bench.run --users 55 --years 5 --only entries.export_ndjson
+#
+# Every user gets one entry per day, so the database holds users x years x 365
+# entries: the export run above seeds 100,375. Scenarios that stream rows also
+# report rows/s (rows per response times responses per second).
+#
+# q/req is the mean number of SQL statements per request, read from the
+# g.db_queries counter that helpers/metrics.py keeps. Statements a streamed
+# body runs after the view returns are not included.
+#
+# --compare exits with status 1 when any endpoint's p95 latency or throughput
+# regresses by more than --threshold against the saved results.
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet
+from datetime import timedelta
+from .stubs import AppleKeyServer, GeminiServer
+from .seed import PLACES
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+SEARCH_WORDS = ["coffee", "sunshine", "music", "garden", "teacher", "ocean", "mountain", "kindness"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GratefulTime API benchmarks")
+    parser.add_argument('--database-url')
+    parser.add_argument('--redis-url', default='redis://127.0.0.1:6379/15')
+    parser.add_argument('--fakeredis', action='store_true')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--gemini-latency', type=float, default=0.0)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--gemini-drop-rate', type=float, default=0.0)
+    parser.add_argument('--only', nargs='*', help="run only these scenarios")
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, apple, gemini):
+    database_url = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix='gt-bench-'), 'bench.db')
+    os.environ.update({
+        'SECRET_KEY': 'bench-secret',
+        'ENCRYPTION_KEY': Fernet.generate_key().decode(),
+        'GEMINI_API_KEY': 'bench',
+        'GEMINI_API_BASE': gemini.base_url,
+        'APPLE_KEYS_URL': apple.url,
+        'REDIS_URL': args.redis_url,
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'RATELIMIT_ENABLED': 'false',
+        'EXPORT_MAX_CONCURRENT': str(max(args.concurrency, 1)),
+    })
+    return database_url
+
+
+def use_fakeredis():
+    import fakeredis
+    import redis
+
+    server = fakeredis.FakeServer()
+
+    def from_url(cls, url, **kwargs):
+        return cls(connection_class=fakeredis.FakeConnection, server=server)
+
+    redis.connection.BlockingConnectionPool.from_url = classmethod(from_url)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))),
+                len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(app, scenario, iterations, warmup, concurrency):
+    clients = [app.test_client() for _ in range(concurrency)]
+    for i in range(warmup):
+        scenario(clients[0], i)
+
+    def run(worker):
+        client = clients[worker]
+        timings, errors = [], 0
+        for i in range(worker, iterations, concurrency):
+            started = time.perf_counter()
+            ok = scenario(client, i)
+            timings.append(time.perf_counter() - started)
+            errors += 0 if ok else 1
+        return timings, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(t for worker_timings, _ in results for t in worker_timings)
+    return {
+        'n': len(timings),
+        'errors': sum(errors for _, errors in results),
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'rps': len(timings) / elapsed if elapsed else 0.0
+    }
+
+
+def ok(response, *statuses):
+    response.close()
+    return response.status_code in (statuses or (200,))
+
+
+def build_scenarios(app, apple, user_ids):
+    from app import db
+    from app.config import Config
+    from app.models import GratitudeEntry
+    from app.helpers.utils import encode_token, encode_cursor
+    from app.helpers.timezones import local_today
+
+    rng = random.Random(7)
+    tokens = {user_id: encode_token(user_id) for user_id in user_ids}
+
+    def auth(user_id, **headers):
+        return {'Authorization': f"Bearer {tokens[user_id]}", **headers}
+
+    def pick(i):
+        return user_ids[i % len(user_ids)]
+
+    with app.app_context():
+        deep_cursors, entry_ids = {}, {}
+        for user_id in user_ids:
+            rows = GratitudeEntry.query.filter_by(user_id=user_id).order_by(
+                GratitudeEntry.timestamp.desc(), GratitudeEntry.id.desc()
+            ).offset(300).limit(1).all()
+            if rows:
+                deep_cursors[user_id] = encode_cursor(rows[0].timestamp, rows[0].id)
+            entry_ids[user_id] = [row.id for row in db.session.query(
+                GratitudeEntry.id).filter_by(user_id=user_id).limit(500)]
+
+    today = local_today("America/New_York")
+    range_from = (today.replace(day=1) - timedelta(days=62)).strftime('%Y-%m')
+    range_to = today.strftime('%Y-%m')
+    etags = {}
+
+    def entries_offset(client, i):
+        return ok(client.get(f"/api/v1/entries?limit=10&offset={rng.randint(0, 300)}",
+                             headers=auth(pick(i))))
+
+    def entries_cursor(client, i):
+        user_id = pick(i)
+        return ok(client.get(f"/api/v1/entries?limit=10&cursor={deep_cursors.get(user_id, '')}",
+                             headers=auth(user_id)))
+
+    def entry_by_id(client, i):
+        user_id = pick(i)
+        return ok(client.get(f"/api/v1/entries/{rng.choice(entry_ids[user_id])}",
+                             headers=auth(user_id)))
+
+    def conditional_304(client, i):
+        user_id = pick(i)
+        if user_id not in etags:
+            etags[user_id] = client.get(
+                "/api/v1/users/info", headers=auth(user_id)).headers.get('ETag', '')
+        return ok(client.get("/api/v1/users/info",
+                             headers=auth(user_id, **{'If-None-Match': etags[user_id]})), 200, 304)
+
+    def submit_delete(client, i):
+        user_id = pick(i)
+        created = client.post("/api/v1/entries", headers=auth(user_id), json={
+            'entry1': 'Morning coffee', 'entry2': 'A long walk', 'entry3': 'Calling home',
+            'user_prompt': 'What made you smile today?',
+            'user_prompt_response': 'A friend sent me a photo from our trip'
+        })
+        if created.status_code != 201:
+            return ok(created, 201)
+        entry_id = created.get_json()['data']['id']
+        return ok(client.delete(f"/api/v1/entries/{entry_id}", headers=auth(user_id)))
+
+    def export_ndjson(client, i):
+        response = client.get("/api/v1/entries/export", headers=auth(pick(i)))
+        export_ndjson.rows.append(sum(chunk.count(b'\n') for chunk in response.response))
+        return ok(response)
+
+    export_ndjson.rows = []
+
+    def summary_stream(client, i):
+        response = client.get("/api/v1/ai/monthlysummary/stream", headers=auth(pick(i)))
+        for _ in response.response:
+            pass
+        return ok(response)
+
+    def applelogin(client, i):
+        token = apple.identity_token("bench.0", Config.APPLE_AUDIENCE, Config.APPLE_ISSUER)
+        return ok(client.post("/api/v1/auth/applelogin", json={
+            'identityToken': token, 'user': "bench.0", 'email': "bench0@example.com",
+            'fullName': {'givenName': 'Bench', 'familyName': '0'},
+            'user_timezone': "America/New_York"
+        }))
+
+    # Clears the cached summary first so every call reaches the Gemini stub
+    # (and its injected faults) through the outbound HTTP client
+    def summary_uncached(client, i):
+        from app.helpers.summary_cache import summary_cache, month_key
+        user_id = pick(i)
+        with app.app_context():
+            summary_cache.invalidate(user_id, month_key(today))
+        return ok(client.get("/api/v1/ai/monthlysummary", headers=auth(user_id)), 200, 503)
+
+    # A place (rare) alone or with a common word
+    def search_words():
+        words = [rng.choice(PLACES)]
+        if rng.random() < 0.5:
+            words.append(rng.choice(SEARCH_WORDS))
+        return " ".join(words)
+
+    def search(client, i):
+        return ok(client.get(f"/api/v1/entries/search?q={search_words()}&limit=10",
+                             headers=auth(pick(i))))
+
+    # What search costs without the index: decrypt newest first until ten
+    # entries contain every word, which for rare words means most of history
+    def search_scan(client, i):
+        from app.helpers.crypto import decrypt_entry
+        from app.helpers.search import normalize_words, SEARCH_FIELDS
+        words = normalize_words(search_words())
+        with app.app_context():
+            matches = 0
+            for entry in GratitudeEntry.query.filter_by(user_id=pick(i)).order_by(
+                    GratitudeEntry.timestamp.desc()).yield_per(500):
+                fields = decrypt_entry(entry)
+                if words <= set().union(*(normalize_words(fields[f]) for f in SEARCH_FIELDS)):
+                    matches += 1
+                    if matches == 10:
+                        break
+        return True
+
+    def get(path):
+        return lambda client, i: ok(client.get(path, headers=auth(pick(i))))
+
+    # (name, scenario, share of --iterations)
+    return [
+        ('entries.offset', entries_offset, 1),
+        ('entries.cursor', entries_cursor, 1),
+        ('entries.by_id', entry_by_id, 1),
+        ('entries.days_full', get("/api/v1/entries/days"), 0.25),
+        ('entries.days_range', get(f"/api/v1/entries/days?from={range_from}&to={range_to}"), 1),
+        ('entries.user_month_days', get("/api/v1/entries/user_month_days"), 1),
+        ('entries.submit_delete', submit_delete, 0.5),
+        ('entries.export_ndjson', export_ndjson, 0.05),
+        ('entries.search', search, 1),
+        ('entries.search_scan', search_scan, 0.05),
+        ('users.info', get("/api/v1/users/info"), 1),
+        ('users.recent', get("/api/v1/users/recententrytimestamp"), 1),
+        ('users.info_304', conditional_304, 1),
+        ('ai.monthlysummary', get("/api/v1/ai/monthlysummary"), 0.25),
+        ('ai.monthlysummary_uncached', summary_uncached, 0.25),
+        ('ai.monthlysummary_stream', summary_stream, 0.25),
+        ('auth.applelogin', applelogin, 0.5),
+    ]
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if current['rps'] < base['rps'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['rps']:.1f}/s -> {current['rps']:.1f}/s")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    apple = AppleKeyServer()
+    gemini = GeminiServer(latency=args.gemini_latency, error_rate=args.gemini_error_rate,
+                          drop_rate=args.gemini_drop_rate)
+    database_url = configure_environment(args, apple, gemini)
+    if args.fakeredis:
+        use_fakeredis()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app import create_app, db
+    from flask import g
+    from .seed import seed_users
+
+    app = create_app()
+    queries = []
+
+    @app.after_request
+    def count_queries(response):
+        if 'db_queries' in g:
+            queries.append(g.db_queries)
+        return response
+
+    with app.app_context():
+        if database_url.startswith('sqlite'):
+            db.create_all()
+        else:
+            from flask_migrate import upgrade
+            upgrade()
+
+        print(f"Seeding {args.users} users x {args.years} years of entries...")
+        user_ids = seed_users(args.users, args.years)
+
+        from app.helpers.search import build_search_index
+        started = time.perf_counter()
+        indexed = build_search_index()
+        print(f"Built the search index for {indexed} entries in {time.perf_counter() - started:.1f}s")
+
+    results = {}
+    print(f"{'scenario':28} {'n':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'q/req':>6}")
+    for name, scenario, share in build_scenarios(app, apple, user_ids):
+        if args.only and name not in args.only:
+            continue
+        iterations = max(int(args.iterations * share), 3)
+        queries.clear()
+        stats = measure(app, scenario, iterations, min(args.warmup, iterations), args.concurrency)
+        stats['queries_per_request'] = sum(queries) / len(queries) if queries else None
+        rows = getattr(scenario, 'rows', None)
+        if rows:
+            stats['rows_per_s'] = sum(rows) / len(rows) * stats['rps']
+        results[name] = stats
+        queries_per_request = stats['queries_per_request']
+        print(f"{name:28} {stats['n']:>6} {stats['errors']:>4} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['rps']:>9.1f} "
+              f"{'-' if queries_per_request is None else format(queries_per_request, '.1f'):>6}")
+        if rows:
+            print(f"{'':28} {sum(rows) / len(rows):>9.0f} rows/response {stats['rows_per_s']:>12.0f} rows/s")
+
+    print(f"Stub traffic: {apple.requests} JWKS fetches, {gemini.requests} Gemini calls")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from datetime import timedelta
+import random
+
+WORDS = ("family friends coffee sunshine music walk dinner health home work "
+         "rain garden book laughter morning evening quiet kindness teacher "
+         "sister brother dog cat weekend trip ocean mountain bread tea").split()
+# Each entry mentions one place, so a place matches about one entry in 40;
+# the common words above match nearly every entry
+PLACES = ("paris lisbon kyoto nairobi lima oslo denver austin dublin cairo "
+          "hanoi quito seville porto krakow tbilisi accra busan perth halifax "
+          "tucson boise fresno tulsa omaha reno salem tacoma eugene bend "
+          "nelson hobart darwin cairns napier dunedin taupo whistler banff jasper").split()
+PROMPT = "What made you smile today?"
+
+
+def sentence(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed_users(users, years, timezone_name="America/New_York", seed=1):
+    from app import db
+    from app.models import User, GratitudeEntry
+    from app.helpers.crypto import encrypt_entry
+    from app.helpers.calendar import rebuild_user_calendar
+    from app.helpers.timezones import local_today, local_day_bounds_utc
+
+    rng = random.Random(seed)
+    today = local_today(timezone_name)
+    user_ids = []
+
+    for n in range(users):
+        user = User(email=f"bench{n}@example.com", username=f"Bench {n}",
+                    apple_user_id=f"bench.{n}", user_timezone=timezone_name)
+        db.session.add(user)
+        db.session.flush()
+
+        # Yesterday backwards, so today stays free for the submit benchmark
+        rows = []
+        for days_ago in range(1, years * 365 + 1):
+            local_date = today - timedelta(days=days_ago)
+            start_utc, _ = local_day_bounds_utc(timezone_name, local_date)
+            rows.append({
+                'user_id': user.user_id,
+                'payload': encrypt_entry({
+                    'entry1': sentence(rng), 'entry2': sentence(rng), 'entry3': sentence(rng),
+                    'user_prompt': PROMPT,
+                    'user_prompt_response': f"{sentence(rng, 20)} in {rng.choice(PLACES).capitalize()}"
+                }),
+                'local_date': local_date,
+                'timestamp': start_utc + timedelta(hours=rng.randint(8, 22))
+            })
+        db.session.execute(GratitudeEntry.__table__.insert(), rows)
+        rebuild_user_calendar(user)
+        db.session.commit()
+        user_ids.append(user.user_id)
+
+    return user_ids
@@ -0,0 +1,145 @@
+from cryptography.hazmat.primitives.asymmetric import rsa
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from jwt.algorithms import RSAAlgorithm
+import json
+import random
+import socket
+import threading
+import time
+import jwt
+
+STUB_KID = "bench-key"
+
+
+def serve(handler_class):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Local stand-in for https://appleid.apple.com/auth/keys. The private key is
+# kept so the benchmark can mint identity tokens Apple would have issued.
+class AppleKeyServer:
+    def __init__(self, max_age=3600):
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update(kid=STUB_KID, use="sig", alg="RS256")
+        body = json.dumps({"keys": [jwk]}).encode()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.status != 200:
+                    self.send_response(stub.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"max-age={max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        # Set to e.g. 503 to simulate an Apple outage
+        self.status = 200
+        self.requests = 0
+        self.server, self.base_url = serve(Handler)
+        self.url = f"{self.base_url}/auth/keys"
+
+    def identity_token(self, apple_user_id, audience, issuer):
+        now = int(time.time())
+        return jwt.encode(
+            {"sub": apple_user_id, "aud": audience, "iss": issuer,
+             "iat": now, "exp": now + 600},
+            self.private_key, algorithm="RS256", headers={"kid": STUB_KID})
+
+
+# Local stand-in for the Gemini generateContent and streamGenerateContent
+# endpoints, with configurable latency and injected faults: `error_rate` of
+# requests fail with `error_status`, and `drop_rate` have the connection cut
+# before any response is written. The settings are plain attributes so tests
+# can change them between requests: `text` is the generateContent reply,
+# `stream_texts` replaces the default "Chunk {i}. " stream events, and
+# `cut_after` drops the connection after that many stream events.
+class GeminiServer:
+    def __init__(self, latency=0.0, chunks=8, error_rate=0.0, error_status=503,
+                 drop_rate=0.0, seed=3):
+        stub = self
+        rng = random.Random(seed)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                stub.requests += 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(stub.latency)
+
+                roll = rng.random()
+                if roll < stub.drop_rate:
+                    self._drop()
+                    return
+                if roll < stub.drop_rate + stub.error_rate:
+                    self.send_response(stub.error_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if ":streamGenerateContent" in self.path:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    texts = stub.stream_texts or [f"Chunk {i}. " for i in range(stub.chunks)]
+                    for i, text in enumerate(texts):
+                        if i == stub.cut_after:
+                            self._drop()
+                            return
+                        event = json.dumps(stub.response(text))
+                        self._write_chunk(f"data: {event}\r\n\r\n".encode())
+                    self._write_chunk(b"")
+                    return
+
+                body = json.dumps(stub.response(stub.text)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # GETs get the same canned reply and fault injection, so
+            # HttpClient's idempotent retry path can be exercised too
+            do_GET = do_POST
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _drop(self):
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+
+            def log_message(self, *args):
+                pass
+
+        self.latency = latency
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.text = "You were grateful for the small things."
+        self.stream_texts = None
+        self.cut_after = None
+        self.requests = 0
+        self.server, self.base_url = serve(Handler)
+
+    @staticmethod
+    def response(text):
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
@@ -0,0 +1,58 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-06-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Databases created by db.create_all() before migrations existed already have
+# these tables, so only create what is missing.
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('user'):
+        op.create_table(
+            'user',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=128), nullable=True),
+            sa.Column('email', sa.String(length=128), nullable=True),
+            sa.Column('user_timezone', sa.String(length=64), nullable=True),
+            sa.Column('apple_user_id', sa.String(length=255), nullable=True),
+            sa.Column('preferred_unlock_time', sa.Integer(), nullable=True),
+            sa.Column('account_active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('user_id'),
+            sa.UniqueConstraint('apple_user_id'),
+            sa.UniqueConstraint('email')
+        )
+
+    if not inspector.has_table('gratitude_entry'):
+        op.create_table(
+            'gratitude_entry',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('entry1', sa.String(length=255), nullable=False),
+            sa.Column('entry2', sa.String(length=255), nullable=False),
+            sa.Column('entry3', sa.String(length=255), nullable=False),
+            sa.Column('user_prompt', sa.String(length=255), nullable=False),
+            sa.Column('user_prompt_response',
+                      sa.String(length=255), nullable=False),
+            sa.Column('timestamp', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('gratitude_entry')
+    op.drop_table('user')
@@ -0,0 +1,37 @@
+"""single encrypted payload per entry
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-06-02 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+LEGACY_FIELDS = ('entry1', 'entry2', 'entry3',
+                 'user_prompt', 'user_prompt_response')
+
+
+def upgrade():
+    with op.batch_alter_table('gratitude_entry') as batch_op:
+        batch_op.add_column(sa.Column('payload', sa.Text(), nullable=True))
+        for field in LEGACY_FIELDS:
+            batch_op.alter_column(
+                field, existing_type=sa.String(length=255), nullable=True)
+
+
+# Run `flask migrate-entry-format` in reverse first: rows that only have a
+# payload cannot satisfy the NOT NULL legacy columns.
+def downgrade():
+    with op.batch_alter_table('gratitude_entry') as batch_op:
+        for field in LEGACY_FIELDS:
+            batch_op.alter_column(
+                field, existing_type=sa.String(length=255), nullable=False)
+        batch_op.drop_column('payload')
@@ -0,0 +1,42 @@
+"""indexes for per-user entry queries and email lookup
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-06-03 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+# Built CONCURRENTLY on Postgres so the entries table stays writable.
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gratitude_entry_user_id_timestamp',
+            'gratitude_entry',
+            ['user_id', sa.text('timestamp DESC')],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_user_email_lower',
+            'user',
+            [sa.text('lower(email)')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_email_lower', table_name='user',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_gratitude_entry_user_id_timestamp',
+                      table_name='gratitude_entry',
+                      postgresql_concurrently=True)
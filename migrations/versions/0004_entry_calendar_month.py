@@ -0,0 +1,31 @@
+"""per-user monthly calendar of entry days
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-06-04 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+# Populate with `flask backfill-calendar` after upgrading
+def upgrade():
+    op.create_table(
+        'entry_calendar_month',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('days', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('entry_calendar_month')
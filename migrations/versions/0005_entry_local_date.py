@@ -0,0 +1,54 @@
+"""store the local entry date and enforce one entry per day
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-06-05 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('gratitude_entry',
+                  sa.Column('local_date', sa.Date(), nullable=True))
+
+    # Backfill using each user's current timezone
+    op.execute("""
+        UPDATE gratitude_entry AS e
+        SET local_date = (e.timestamp AT TIME ZONE
+                          COALESCE(u.user_timezone, 'America/New_York'))::date
+        FROM "user" AS u
+        WHERE u.user_id = e.user_id AND e.local_date IS NULL
+    """)
+
+    # Rows that collide after a timezone change keep a NULL local date; only
+    # the earliest entry of each day takes part in the constraint
+    op.execute("""
+        UPDATE gratitude_entry SET local_date = NULL
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, local_date ORDER BY id) AS rn
+                FROM gratitude_entry
+                WHERE local_date IS NOT NULL
+            ) AS ranked
+            WHERE ranked.rn > 1
+        )
+    """)
+
+    op.create_unique_constraint('uq_gratitude_entry_user_local_date',
+                                'gratitude_entry', ['user_id', 'local_date'])
+
+
+def downgrade():
+    op.drop_constraint('uq_gratitude_entry_user_local_date',
+                       'gratitude_entry', type_='unique')
+    op.drop_column('gratitude_entry', 'local_date')
@@ -0,0 +1,29 @@
+"""idempotency keys for offline entry sync
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-06-06 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('gratitude_entry', sa.Column(
+        'idempotency_key', sa.String(length=64), nullable=True))
+    op.create_unique_constraint('uq_gratitude_entry_user_idempotency_key',
+                                'gratitude_entry', ['user_id', 'idempotency_key'])
+
+
+def downgrade():
+    op.drop_constraint('uq_gratitude_entry_user_idempotency_key',
+                       'gratitude_entry', type_='unique')
+    op.drop_column('gratitude_entry', 'idempotency_key')
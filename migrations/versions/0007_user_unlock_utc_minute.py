@@ -0,0 +1,37 @@
+"""index users by the UTC minute of their unlock time
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-06-07 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+# The column starts empty; `flask rebuild-unlock-index` (or the reminder
+# scheduler on startup) fills it in with one UPDATE per timezone.
+def upgrade():
+    op.add_column('user', sa.Column(
+        'unlock_utc_minute', sa.SmallInteger(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_unlock_utc_minute',
+            'user',
+            ['unlock_utc_minute'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_unlock_utc_minute', table_name='user',
+                      postgresql_concurrently=True)
+    op.drop_column('user', 'unlock_utc_minute')
@@ -0,0 +1,36 @@
+"""per-user streak and count aggregates
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-06-08 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+# Filled in by `flask backfill-stats`; until then /users/stats computes the
+# aggregates from the calendar table.
+def upgrade():
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_days', sa.Integer(), nullable=False),
+        sa.Column('current_streak', sa.Integer(), nullable=False),
+        sa.Column('longest_streak', sa.Integer(), nullable=False),
+        sa.Column('longest_streak_end', sa.Date(), nullable=True),
+        sa.Column('last_entry_date', sa.Date(), nullable=True),
+        sa.Column('month_counts', sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_stats')
@@ -0,0 +1,35 @@
+"""blind keyword index for entry search
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-06-09 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+# Populate with `flask backfill-search-index` after upgrading
+def upgrade():
+    op.create_table(
+        'entry_search_token',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(length=32), nullable=False),
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'token', 'entry_id')
+    )
+    op.create_index('ix_entry_search_token_entry_id',
+                    'entry_search_token', ['entry_id'])
+
+
+def downgrade():
+    op.drop_index('ix_entry_search_token_entry_id',
+                  table_name='entry_search_token')
+    op.drop_table('entry_search_token')
@@ -0,0 +1,42 @@
+"""backfill the entry calendar from existing entries
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-06-10 00:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+# Same placement as rebuild_user_calendar: the stored local date, or the
+# user's current timezone for rows that lost theirs in 0005. Rows the app has
+# already written are merged, not replaced.
+def upgrade():
+    op.execute("""
+        INSERT INTO entry_calendar_month (user_id, month, days)
+        SELECT user_id,
+               EXTRACT(YEAR FROM day)::int * 100 + EXTRACT(MONTH FROM day)::int,
+               bit_or(1 << (EXTRACT(DAY FROM day)::int - 1))
+        FROM (
+            SELECT e.user_id,
+                   COALESCE(e.local_date,
+                            (e.timestamp AT TIME ZONE
+                             COALESCE(u.user_timezone, 'America/New_York'))::date) AS day
+            FROM gratitude_entry AS e
+            JOIN "user" AS u ON u.user_id = e.user_id
+        ) AS entry_days
+        GROUP BY user_id, EXTRACT(YEAR FROM day), EXTRACT(MONTH FROM day)
+        ON CONFLICT (user_id, month)
+        DO UPDATE SET days = entry_calendar_month.days | EXCLUDED.days
+    """)
+
+
+def downgrade():
+    pass
@@ -19,4 +19,10 @@ git pull
 python3 -m venv .venv
 source .venv/bin/activate
 pip install -r requirements.txt
+flask --app wsgi db upgrade
+flask --app wsgi backfill-stats --missing
+flask --app wsgi build-assets
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/gratefultime-metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
 gunicorn -b ":$PORT" wsgi:app
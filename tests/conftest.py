@@ -0,0 +1,89 @@
+# Boots create_app() once per session against a throwaway SQLite database,
+# fakeredis and the bench stub Apple/Gemini servers. Config is read at import
+# time, so the environment has to be in place before anything under app/ is
+# imported.
+#
+#   pip install -r requirements-dev.txt
+#   python -m pytest -q
+#   TEST_POSTGRES_URL=postgresql+psycopg2://localhost/gt_test python -m pytest -q tests/test_indexes.py
+from cryptography.fernet import Fernet
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.run import use_fakeredis
+from bench.stubs import AppleKeyServer, GeminiServer
+
+apple_server = AppleKeyServer()
+gemini_server = GeminiServer(chunks=3)
+
+os.environ.update({
+    'SECRET_KEY': 'test-secret',
+    'ENCRYPTION_KEY': Fernet.generate_key().decode(),
+    'GEMINI_API_KEY': 'test',
+    'GEMINI_API_BASE': gemini_server.base_url,
+    'APPLE_KEYS_URL': apple_server.url,
+    'REDIS_URL': 'redis://127.0.0.1:6379/15',
+    'SQLALCHEMY_DATABASE_URI': "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix='gt-test-'), 'test.db'),
+    'RATELIMIT_ENABLED': 'false',
+})
+use_fakeredis()
+
+from app import create_app, db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    return create_app()
+
+
+# Fresh tables and an empty Redis for every test
+@pytest.fixture
+def app(flask_app):
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        flask_app.extensions['redis'].flushall()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def gemini():
+    return gemini_server
+
+
+@pytest.fixture
+def make_user(app):
+    from app.models import User
+    from app.helpers.utils import encode_token
+
+    def make(timezone_name="America/New_York", **fields):
+        with app.app_context():
+            user = User(user_timezone=timezone_name, **fields)
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.user_id
+        return user_id, {'Authorization': f"Bearer {encode_token(user_id)}"}
+
+    return make
+
+
+@pytest.fixture
+def entry_fields():
+    def fields(**overrides):
+        return {'entry1': 'Morning coffee', 'entry2': 'A long walk', 'entry3': 'Calling home',
+                'user_prompt': 'What made you smile today?',
+                'user_prompt_response': 'A friend sent me a photo from our trip', **overrides}
+
+    return fields
@@ -0,0 +1,105 @@
+import gzip
+import os
+import shutil
+import brotli
+import pytest
+
+from app import create_app
+from app.config import Config
+from app.helpers import assets as assets_module
+from app.helpers.assets import assets, build_assets
+
+
+# One build of a copy of the static folder, without the PNGs whose WebP/AVIF
+# variants take seconds to encode, swapped into the pipeline for each test
+@pytest.fixture(scope='module')
+def build(flask_app, tmp_path_factory):
+    static = tmp_path_factory.mktemp('assets') / 'static'
+    shutil.copytree(flask_app.static_folder, static, ignore=shutil.ignore_patterns('dist', '*.png'))
+    return static, build_assets(str(static))
+
+
+@pytest.fixture
+def built(build, monkeypatch):
+    static, manifest = build
+    monkeypatch.setattr(assets, 'directory', os.path.join(static, assets_module.DIST_DIR))
+    monkeypatch.setattr(assets, 'manifest', manifest)
+    monkeypatch.setattr(assets, 'encodings', {e['path']: e['encodings'] for e in manifest.values()})
+    return build
+
+
+@pytest.fixture
+def fresh_pages(monkeypatch):
+    monkeypatch.setattr(assets, 'pages', {})
+
+
+def test_create_app_does_not_render_the_landing_page(monkeypatch):
+    rendered = []
+    monkeypatch.setattr(assets, 'prerender', lambda *args: rendered.append(args))
+
+    create_app()
+
+    assert rendered == []
+    assert assets.deferred == {'index.html': Config.PUBLIC_URL}
+
+
+def test_landing_page_is_rendered_on_first_request(client, fresh_pages):
+    response = client.get('/', headers={'Accept-Encoding': 'identity'})
+
+    assert response.status_code == 200
+    assert 'index.html' in assets.pages
+    assert response.headers['Cache-Control'] == assets_module.PAGE_CACHE_CONTROL
+    assert response.data == assets.pages['index.html'][None][0]
+
+
+@pytest.mark.parametrize('encoding, decode', [('br', brotli.decompress), ('gzip', gzip.decompress)])
+def test_landing_page_is_compressed_and_conditional(client, fresh_pages, encoding, decode):
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'})
+    response = client.get('/', headers={'Accept-Encoding': encoding})
+
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert decode(response.data) == plain.data
+    assert response.headers['ETag'] != plain.headers['ETag']
+
+    again = client.get('/', headers={'Accept-Encoding': encoding, 'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+@pytest.mark.parametrize('encoding, decode', [('br', brotli.decompress), ('gzip', gzip.decompress)])
+def test_text_asset_is_served_precompressed(client, built, encoding, decode):
+    static, manifest = built
+    entry = manifest['css/main.css']
+    assert encoding in entry['encodings']
+
+    response = client.get(f"/assets/{entry['path']}", headers={'Accept-Encoding': encoding})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == encoding
+    assert response.headers['Cache-Control'] == assets_module.IMMUTABLE
+    assert response.mimetype == 'text/css'
+    assert decode(response.data) == (static / 'css' / 'main.css').read_bytes()
+
+
+def test_asset_without_accepted_encoding_is_sent_plain(client, built):
+    static, manifest = built
+    response = client.get(f"/assets/{manifest['css/main.css']['path']}",
+                          headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == (static / 'css' / 'main.css').read_bytes()
+
+
+def test_asset_revalidation_answers_304(client, built):
+    _, manifest = built
+    path = f"/assets/{manifest['images/favicon.ico']['path']}"
+
+    first = client.get(path)
+    assert first.status_code == 200
+    assert 'Content-Encoding' not in first.headers
+
+    again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    since = client.get(path, headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
@@ -0,0 +1,73 @@
+from datetime import timedelta
+import pytest
+
+from app import db
+from app.models import GratitudeEntry, User
+from app.helpers.calendar import rebuild_user_calendar, format_month, month_index
+from app.helpers.crypto import encrypt_entry
+from app.helpers.timezones import local_today, local_day_bounds_utc
+
+TIMEZONE = "America/New_York"
+
+
+# Entries written before the calendar existed: rows only, no calendar bits
+@pytest.fixture
+def legacy_user(app, make_user, entry_fields):
+    user_id, headers = make_user(TIMEZONE)
+    today = local_today(TIMEZONE)
+    days = [today - timedelta(days=n) for n in range(0, 45, 3)]
+    with app.app_context():
+        for day in days:
+            start_utc, _ = local_day_bounds_utc(TIMEZONE, day)
+            db.session.add(GratitudeEntry(user_id=user_id, payload=encrypt_entry(entry_fields()),
+                                          local_date=day, timestamp=start_utc + timedelta(hours=20)))
+        db.session.commit()
+    return user_id, headers, days
+
+
+def month_counts(days):
+    months = [format_month(month_index(day)) for day in days]
+    return {month: months.count(month) for month in months}
+
+
+def read_calendar(client, headers, days):
+    start, end = format_month(month_index(min(days))), format_month(month_index(max(days)))
+    counts = client.get(f"/api/v1/entries/user_month_days?from={start}&to={end}",
+                        headers=headers).get_json()
+    listed = client.get(f"/api/v1/entries/days?from={start}&to={end}", headers=headers).get_json()
+    return counts, listed
+
+
+def test_month_days_before_backfill_match_after(app, client, legacy_user):
+    user_id, headers, days = legacy_user
+    before = read_calendar(client, headers, days)
+
+    expected = month_counts(days)
+    counts, listed = before
+    assert counts['days_count'] == expected[format_month(month_index(max(days)))]
+    assert {m['month']: m['days_count'] for m in counts['months']} == expected
+    assert {m['month']: len(m['days']) for m in listed['data']} == expected
+
+    with app.app_context():
+        rebuild_user_calendar(db.session.get(User, user_id))
+        db.session.commit()
+    assert read_calendar(client, headers, days) == before
+
+
+def test_submit_marks_the_calendar(client, make_user, entry_fields):
+    _, headers = make_user(TIMEZONE)
+    assert client.get("/api/v1/entries/user_month_days", headers=headers).get_json()['days_count'] == 0
+
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields()).status_code == 201
+    assert client.get("/api/v1/entries/user_month_days", headers=headers).get_json()['days_count'] == 1
+
+
+# Released clients call /days without a range and open entries by id
+def test_days_without_range_keep_the_entry_shape(client, legacy_user):
+    _, headers, days = legacy_user
+    data = client.get("/api/v1/entries/days", headers=headers).get_json()['data']
+
+    assert len(data) == len(days)
+    assert all(set(row) == {'id', 'timestamp'} for row in data)
+    row = data[0]
+    assert client.get(f"/api/v1/entries/{row['id']}", headers=headers).get_json()['data']['timestamp'] == row['timestamp']
@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta, timezone
+import pytest
+
+from app import db
+from app.config import Config
+from app.models import GratitudeEntry
+from app.helpers.crypto import encrypt_entry
+
+ENTRIES = 57
+
+
+# Pairs of entries share a timestamp so paging has to break ties on id
+@pytest.fixture
+def history(app, make_user, entry_fields):
+    user_id, headers = make_user()
+    start = datetime(2024, 1, 1, 20, tzinfo=timezone.utc)
+    with app.app_context():
+        rows = [GratitudeEntry(user_id=user_id, payload=encrypt_entry(entry_fields(entry1=f"Entry {n}")),
+                               timestamp=start + timedelta(days=n // 2), local_date=date(2024, 1, 1) + timedelta(days=n))
+                for n in range(ENTRIES)]
+        db.session.add_all(rows)
+        db.session.commit()
+        ids = [row.id for row in sorted(rows, key=lambda row: (row.timestamp, row.id), reverse=True)]
+    return headers, ids
+
+
+def test_cursor_pages_cover_every_entry_once(client, history):
+    headers, ids = history
+    seen, cursor, pages = [], '', 0
+    while cursor is not None:
+        response = client.get("/api/v1/entries", headers=headers,
+                              query_string={'cursor': cursor, 'limit': 10})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert 'nextOffset' not in body
+        seen += [entry['id'] for entry in body['data']]
+        cursor = body['nextCursor']
+        pages += 1
+
+    assert seen == ids
+    assert pages == 6
+
+
+def test_offset_pages_match_cursor_order(client, history):
+    headers, ids = history
+    body = client.get("/api/v1/entries?limit=20&offset=40", headers=headers).get_json()
+    assert [entry['id'] for entry in body['data']] == ids[40:]
+    assert body['nextOffset'] is None
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '%%%', 'MjAyNHwx'])
+def test_malformed_cursor_is_rejected(client, history, cursor):
+    headers, _ = history
+    response = client.get("/api/v1/entries", headers=headers, query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid cursor'
+
+
+def test_limit_is_capped_at_max_page_size(client, history):
+    headers, _ = history
+    body = client.get("/api/v1/entries?limit=500", headers=headers).get_json()
+    assert len(body['data']) == Config.MAX_PAGE_SIZE
+    assert body['nextOffset'] == Config.MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize('query, message', [
+    ('limit=0', 'limit must be positive'),
+    ('limit=-5', 'limit must be positive'),
+    ('offset=-1', 'offset must not be negative'),
+    ('limit=ten', 'limit and offset must be integers'),
+])
+def test_invalid_limit_and_offset(client, history, query, message):
+    headers, _ = history
+    response = client.get(f"/api/v1/entries?{query}", headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+
+
+def test_second_submit_on_the_same_day_is_rejected(app, client, make_user, entry_fields):
+    user_id, headers = make_user()
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields()).status_code == 201
+
+    response = client.post("/api/v1/entries", headers=headers, json=entry_fields(entry1="Another try"))
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'Already submitted today', 'errorCode': 'submission'}
+    with app.app_context():
+        assert GratitudeEntry.query.filter_by(user_id=user_id).count() == 1
+
+
+def test_submit_again_after_deleting_today(client, make_user, entry_fields):
+    _, headers = make_user()
+    first = client.post("/api/v1/entries", headers=headers, json=entry_fields()).get_json()['data']['id']
+    assert client.delete(f"/api/v1/entries/{first}", headers=headers).status_code == 200
+
+    response = client.post("/api/v1/entries", headers=headers, json=entry_fields(entry1="Second thoughts"))
+    assert response.status_code == 201
+    second = response.get_json()['data']['id']
+    assert client.get(f"/api/v1/entries/{second}", headers=headers).get_json()['data']['entry1'] == "Second thoughts"
+    assert client.get("/api/v1/users/stats", headers=headers).get_json()['data']['total_days'] == 1
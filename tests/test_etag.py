@@ -0,0 +1,52 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import pytest
+
+CONDITIONAL_ENDPOINTS = [
+    "/api/v1/entries?limit=10",
+    "/api/v1/entries/days",
+    "/api/v1/entries/user_month_days",
+    "/api/v1/entries/search?q=coffee",
+    "/api/v1/users/recententrytimestamp",
+    "/api/v1/users/info",
+    "/api/v1/users/stats",
+]
+
+
+@pytest.fixture
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.mark.parametrize('path', CONDITIONAL_ENDPOINTS)
+def test_not_modified_runs_no_queries(client, make_user, entry_fields, count_queries, path):
+    _, headers = make_user()
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields()).status_code == 201
+    assert count_queries  # the listener sees the app's statements
+
+    first = client.get(path, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    count_queries.clear()
+    second = client.get(path, headers={**headers, 'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert count_queries == []
+
+
+def test_write_changes_the_etag(client, make_user, entry_fields):
+    _, headers = make_user()
+    etag = client.get("/api/v1/entries/days", headers=headers).headers['ETag']
+
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields()).status_code == 201
+    response = client.get("/api/v1/entries/days", headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
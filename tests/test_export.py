@@ -0,0 +1,51 @@
+import json
+import pytest
+
+
+@pytest.fixture
+def submit(client, entry_fields):
+    def post(headers):
+        response = client.post("/api/v1/entries", headers=headers, json=entry_fields())
+        assert response.status_code == 201
+
+    return post
+
+
+def test_export_streams_every_entry(client, make_user, submit):
+    _, headers = make_user()
+    submit(headers)
+
+    response = client.get("/api/v1/entries/export", headers=headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    assert [row['entry1'] for row in rows] == ["Morning coffee"]
+
+
+# HEAD never reads the body, so the slot has to come back when the response closes
+def test_head_does_not_hold_the_export_slot(client, make_user, submit):
+    _, headers = make_user()
+    submit(headers)
+
+    head = client.head("/api/v1/entries/export", headers=headers)
+    assert head.status_code == 200
+    head.close()
+
+    response = client.get("/api/v1/entries/export", headers=headers)
+    assert response.status_code == 200
+    response.close()
+
+
+def test_concurrent_export_is_rejected(client, make_user, submit):
+    _, headers = make_user()
+    submit(headers)
+
+    first = client.get("/api/v1/entries/export", headers=headers, buffered=False)
+    second = client.get("/api/v1/entries/export", headers=headers)
+    assert (first.status_code, second.status_code) == (200, 429)
+    first.close()
+    second.close()
+
+    third = client.get("/api/v1/entries/export", headers=headers)
+    assert third.status_code == 200
+    third.close()
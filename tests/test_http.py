@@ -0,0 +1,157 @@
+import socket
+import time
+from types import SimpleNamespace
+import pytest
+import requests
+
+from bench.stubs import GeminiServer
+from app.helpers import http
+from app.helpers.http import CircuitOpenError, HttpClient
+from app.helpers.metrics import OUTBOUND_REQUESTS
+
+
+@pytest.fixture
+def server():
+    stub = GeminiServer()
+    yield stub
+    stub.server.shutdown()
+
+
+# Records backoff sleeps and drives the breaker from a fake monotonic clock
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(now=1000.0, sleeps=[], perf_counter=time.perf_counter)
+    fake.sleep = fake.sleeps.append
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(http, 'time', fake)
+    return fake
+
+
+def make_client(name, **kwargs):
+    options = dict(connect_timeout=1, read_timeout=1, retries=2, backoff=0.1,
+                   max_backoff=0.15, failure_threshold=10, reset_timeout=30)
+    options.update(kwargs)
+    return HttpClient(name, **options)
+
+
+def outcome_count(name, outcome):
+    return OUTBOUND_REQUESTS.labels(name, outcome)._value.get()
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+def test_get_retries_5xx_with_capped_backoff(server, clock):
+    server.error_rate = 1.0
+    client = make_client('test-get-5xx')
+
+    response = client.get(server.base_url)
+
+    assert response.status_code == 503
+    assert server.requests == 3
+    assert len(clock.sleeps) == 2
+    assert 0.05 <= clock.sleeps[0] <= 0.1
+    assert 0.075 <= clock.sleeps[1] <= 0.15
+    assert outcome_count('test-get-5xx', '503') == 3
+
+
+def test_retry_after_is_honoured_up_to_max_backoff(clock):
+    client = make_client('test-retry-after', backoff=0.01, max_backoff=2)
+
+    client._sleep(0, '1')
+    client._sleep(0, '60')
+
+    assert clock.sleeps == [1, 2]
+
+
+def test_get_retries_dropped_connections(server, clock):
+    server.drop_rate = 1.0
+    client = make_client('test-get-drop')
+
+    with pytest.raises(requests.ConnectionError):
+        client.get(server.base_url)
+
+    assert server.requests == 3
+    assert len(clock.sleeps) == 2
+    assert outcome_count('test-get-drop', 'connection_error') == 3
+
+
+def test_post_is_not_retried_once_sent(server, clock):
+    client = make_client('test-post')
+
+    server.error_rate = 1.0
+    assert client.post(server.base_url, json={}).status_code == 503
+    assert server.requests == 1
+
+    server.error_rate, server.drop_rate = 0.0, 1.0
+    with pytest.raises(requests.ConnectionError):
+        client.post(server.base_url, json={})
+    assert server.requests == 2
+    assert clock.sleeps == []
+
+
+def test_post_is_retried_when_the_connection_was_never_made(clock):
+    client = make_client('test-post-refused')
+
+    with pytest.raises(requests.ConnectionError) as excinfo:
+        client.post(closed_port_url(), json={})
+
+    assert http.is_connect_error(excinfo.value)
+    assert len(clock.sleeps) == 2
+    assert outcome_count('test-post-refused', 'connection_error') == 3
+
+
+def test_read_timeout_is_labelled_and_not_retried(server, clock):
+    server.latency = 0.3
+    client = make_client('test-read-timeout', read_timeout=0.05)
+
+    with pytest.raises(requests.ReadTimeout):
+        client.get(server.base_url)
+
+    assert server.requests == 1
+    assert clock.sleeps == []
+    assert outcome_count('test-read-timeout', 'read_timeout') == 1
+    assert outcome_count('test-read-timeout', 'timeout') == 0
+
+
+def test_breaker_opens_half_opens_and_closes(server, clock):
+    client = make_client('test-breaker', retries=0, failure_threshold=2,
+                         reset_timeout=30)
+    server.error_rate = 1.0
+
+    client.post(server.base_url, json={})
+    assert not client.breaker.is_open
+    client.post(server.base_url, json={})
+    assert client.breaker.is_open
+
+    # Open: fail fast without touching the upstream
+    with pytest.raises(CircuitOpenError):
+        client.post(server.base_url, json={})
+    assert server.requests == 2
+    assert outcome_count('test-breaker', 'circuit_open') == 1
+
+    # Half-open: one trial after reset_timeout; a failed trial reopens
+    clock.now += 30
+    assert client.post(server.base_url, json={}).status_code == 503
+    assert server.requests == 3
+    assert client.breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        client.post(server.base_url, json={})
+
+    # Only one trial is let through while it is in flight
+    clock.now += 30
+    assert client.breaker.allow()
+    assert not client.breaker.allow()
+    client.breaker.record_failure()
+
+    # A successful trial closes it again
+    clock.now += 30
+    server.error_rate = 0.0
+    assert client.post(server.base_url, json={}).status_code == 200
+    assert not client.breaker.is_open
+    assert client.post(server.base_url, json={}).status_code == 200
+    assert server.requests == 5
@@ -0,0 +1,108 @@
+# Query plans need Postgres; point TEST_POSTGRES_URL at a throwaway database
+# (its tables are dropped and recreated) to run these.
+from datetime import date, datetime, timedelta, timezone
+import os
+import pytest
+from sqlalchemy import create_engine, func, select, text, tuple_
+
+from app import db
+from app.helpers.calendar import month_index
+from app.models import EntryCalendarMonth, GratitudeEntry, User
+
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+USERS = 100
+ENTRIES_PER_USER = 1000
+# Enough rows in user and entry_calendar_month that a seq scan loses
+ACCOUNTS = 10000
+CALENDAR_MONTHS = 24
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture(scope='module')
+def engine():
+    engine = create_engine(POSTGRES_URL)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+
+    table = GratitudeEntry.__table__
+    start = datetime(2020, 1, 1, 20, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'user_id': user_id, 'email': f"User{user_id}@Example.com"}
+            for user_id in range(1, ACCOUNTS + 1)])
+        months = [month_index(date(2020 + n // 12, n % 12 + 1, 1)) for n in range(CALENDAR_MONTHS)]
+        conn.execute(EntryCalendarMonth.__table__.insert(), [
+            {'user_id': user_id, 'month': month, 'days': 2 ** 28 - 1}
+            for user_id in range(1, ACCOUNTS + 1) for month in months])
+        for user_id in range(1, USERS + 1):
+            conn.execute(table.insert(), [
+                {'user_id': user_id, 'payload': 'v1:seed',
+                 'timestamp': start + timedelta(days=n), 'local_date': (start + timedelta(days=n)).date()}
+                for n in range(ENTRIES_PER_USER)])
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for table in ('gratitude_entry', '"user"', 'entry_calendar_month'):
+            conn.execute(text(f"ANALYZE {table}"))
+
+    yield engine
+    db.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def explain(engine, statement):
+    compiled = statement.compile(engine, compile_kwargs={'literal_binds': True})
+    with engine.connect() as conn:
+        return "\n".join(row[0] for row in conn.execute(text(f"EXPLAIN {compiled}")))
+
+
+# The statement get_entries builds for ?cursor=<timestamp, id>
+def test_keyset_page_uses_user_timestamp_index(engine):
+    cursor_ts = datetime(2021, 6, 1, 20, tzinfo=timezone.utc)
+    statement = select(GratitudeEntry).where(
+        GratitudeEntry.user_id == USERS // 2,
+        tuple_(GratitudeEntry.timestamp, GratitudeEntry.id) < tuple_(cursor_ts, 10 ** 9)
+    ).order_by(GratitudeEntry.timestamp.desc(), GratitudeEntry.id.desc()).limit(11)
+
+    plan = explain(engine, statement)
+    assert 'ix_gratitude_entry_user_id_timestamp' in plan, plan
+
+
+def test_first_page_uses_user_timestamp_index(engine):
+    statement = select(GratitudeEntry).where(GratitudeEntry.user_id == USERS // 2).order_by(
+        GratitudeEntry.timestamp.desc(), GratitudeEntry.id.desc()).limit(11)
+
+    plan = explain(engine, statement)
+    assert 'ix_gratitude_entry_user_id_timestamp' in plan, plan
+
+
+# is_email_taken
+def test_email_lookup_uses_lower_email_index(engine):
+    statement = select(User).where(func.lower(User.email) == 'user50@example.com').limit(1)
+
+    plan = explain(engine, statement)
+    assert 'ix_user_email_lower' in plan, plan
+
+
+# The month-range entry load in ai/pipeline.py prepare_period_summary
+def test_period_entries_use_user_timestamp_index(engine):
+    start_utc = datetime(2021, 3, 1, 5, tzinfo=timezone.utc)
+    statement = select(GratitudeEntry).where(
+        GratitudeEntry.user_id == USERS // 2,
+        GratitudeEntry.timestamp >= start_utc,
+        GratitudeEntry.timestamp < start_utc + timedelta(days=31)
+    ).order_by(GratitudeEntry.timestamp.asc())
+
+    plan = explain(engine, statement)
+    assert 'ix_gratitude_entry_user_id_timestamp' in plan, plan
+
+
+# get_calendar_months, which serves /entries/user_month_days and /entries/days
+def test_calendar_months_use_primary_key(engine):
+    statement = select(EntryCalendarMonth).where(
+        EntryCalendarMonth.user_id == ACCOUNTS // 2,
+        EntryCalendarMonth.month >= month_index(date(2020, 7, 1)),
+        EntryCalendarMonth.month <= month_index(date(2020, 12, 1))
+    ).order_by(EntryCalendarMonth.month.asc())
+
+    plan = explain(engine, statement)
+    assert 'entry_calendar_month_pkey' in plan, plan
@@ -0,0 +1,95 @@
+import threading
+import pytest
+
+from app import db
+from app.ai.jobs import JOB_QUEUE_KEY, run_job
+
+
+@pytest.fixture
+def journal(client, make_user, entry_fields):
+    _, headers = make_user()
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields()).status_code == 201
+    return headers
+
+
+# One pass of the run_workers loop in its own thread and app context
+def start_worker(app):
+    def work():
+        with app.app_context():
+            redis_client = app.extensions['redis']
+            item = redis_client.brpop(JOB_QUEUE_KEY, timeout=5)
+            if item:
+                run_job(redis_client, item[1].decode())
+            db.session.remove()
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    return thread
+
+
+def queue_job(client, headers, period='month'):
+    return client.post(f"/api/v1/ai/monthlysummary/jobs?period={period}", headers=headers)
+
+
+def poll(client, headers, job_id, wait=5):
+    return client.get(f"/api/v1/ai/monthlysummary/jobs/{job_id}?wait={wait}", headers=headers)
+
+
+def test_queued_job_is_run_by_a_worker(app, client, journal, gemini):
+    queued = queue_job(client, journal)
+    assert queued.status_code == 202
+    job_id = queued.get_json()['job_id']
+    assert poll(client, journal, job_id, wait=0).get_json()['status'] == 'queued'
+
+    requests = gemini.requests
+    worker = start_worker(app)
+    job = poll(client, journal, job_id).get_json()
+    worker.join(5)
+
+    assert job['status'] == 'done'
+    assert job['status_code'] == 200
+    assert job['result']['summary'] == gemini.text
+    assert gemini.requests > requests
+
+
+def test_failed_job_reports_the_error_and_frees_the_slot(app, client, journal, gemini, monkeypatch):
+    monkeypatch.setattr(gemini, 'error_rate', 1.0)
+    job_id = queue_job(client, journal).get_json()['job_id']
+
+    start_worker(app).join(5)
+    job = poll(client, journal, job_id, wait=0).get_json()
+    assert (job['status'], job['status_code']) == ('failed', 503)
+    assert job['result']['message'] == 'Failed to contact AI service'
+
+    again = queue_job(client, journal)
+    assert again.status_code == 202
+    assert again.get_json()['job_id'] != job_id
+
+
+def test_pending_job_is_reused_until_it_finishes(app, client, journal):
+    first = queue_job(client, journal)
+    again = queue_job(client, journal)
+    assert (first.status_code, again.status_code) == (202, 200)
+    assert again.get_json() == {'message': 'Summary job already queued',
+                                'job_id': first.get_json()['job_id']}
+    with app.app_context():
+        assert app.extensions['redis'].llen(JOB_QUEUE_KEY) == 1
+
+    start_worker(app).join(5)
+    after = queue_job(client, journal)
+    assert after.status_code == 202
+    assert after.get_json()['job_id'] != first.get_json()['job_id']
+
+
+def test_jobs_are_private_to_their_user(client, journal, make_user):
+    job_id = queue_job(client, journal).get_json()['job_id']
+    _, other = make_user()
+
+    assert poll(client, other, job_id, wait=0).status_code == 404
+    assert queue_job(client, other).get_json()['job_id'] != job_id
+
+
+def test_unknown_period_is_rejected(client, journal):
+    response = queue_job(client, journal, period='week')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'period must be month, quarter or year'
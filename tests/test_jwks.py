@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+import time
+import pytest
+
+from bench.stubs import STUB_KID, AppleKeyServer
+from app.helpers import jwks
+from app.helpers.http import CircuitBreaker, apple_client
+from app.helpers.jwks import AppleKeyCache
+
+
+@pytest.fixture
+def apple(monkeypatch):
+    # Fail fast and keep the shared client's breaker out of other tests
+    monkeypatch.setattr(apple_client, 'retries', 0)
+    monkeypatch.setattr(apple_client, 'breaker', CircuitBreaker(1000, 15))
+    stub = AppleKeyServer(max_age=3600)
+    yield stub
+    stub.server.shutdown()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(now=time.time())
+    monkeypatch.setattr(jwks, 'time', SimpleNamespace(time=lambda: fake.now))
+    return fake
+
+
+def wait_for_refresh(cache):
+    deadline = time.monotonic() + 5
+    while cache._inflight is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_cold_fetch_then_served_from_memory(apple, clock):
+    cache = AppleKeyCache(apple.url)
+
+    key = cache.get_key(STUB_KID)
+
+    assert key is not None
+    assert apple.requests == 1
+    assert cache._expires_at == clock.now + 3600
+    assert cache.get_key(STUB_KID) is key
+    assert apple.requests == 1
+
+
+def test_cold_fetch_fails_when_apple_is_down(apple, clock):
+    apple.status = 503
+
+    with pytest.raises(Exception):
+        AppleKeyCache(apple.url).get_key(STUB_KID)
+
+
+def test_refreshes_in_background_before_expiry(apple, clock):
+    cache = AppleKeyCache(apple.url)
+    key = cache.get_key(STUB_KID)
+    first_expiry = cache._expires_at
+
+    clock.now = cache._refresh_at + 1
+    assert cache.get_key(STUB_KID) is key
+    # A second caller while the refresh is in flight doesn't start another
+    cache._refresh_in_background()
+    wait_for_refresh(cache)
+
+    assert apple.requests == 2
+    assert cache._expires_at > first_expiry
+    assert cache.get_key(STUB_KID) is not None
+
+
+def test_serves_stale_keys_while_apple_is_down(apple, clock):
+    cache = AppleKeyCache(apple.url)
+    key = cache.get_key(STUB_KID)
+
+    apple.status = 503
+    clock.now = cache._expires_at + 1
+
+    assert cache.get_key(STUB_KID) is key
+    assert apple.requests == 2
+    assert cache._expires_at == clock.now + jwks.FAILED_FETCH_RETRY
+
+    # Retried once the short expiry passes, and picked back up on recovery
+    apple.status = 200
+    clock.now = cache._expires_at + 1
+    assert cache.get_key(STUB_KID) is not None
+    assert apple.requests == 3
+    assert cache._expires_at == clock.now + 3600
+
+
+def test_unknown_kid_forces_refresh_at_most_once_per_cooldown(apple, clock):
+    cache = AppleKeyCache(apple.url)
+    cache.get_key(STUB_KID)
+
+    with pytest.raises(Exception, match="No key found"):
+        cache.get_key('rotated-key')
+    assert apple.requests == 2
+
+    clock.now += jwks.UNKNOWN_KID_COOLDOWN - 1
+    with pytest.raises(Exception, match="No key found"):
+        cache.get_key('rotated-key')
+    assert apple.requests == 2
+
+    clock.now += 1
+    with pytest.raises(Exception, match="No key found"):
+        cache.get_key('rotated-key')
+    assert apple.requests == 3
@@ -0,0 +1,137 @@
+from datetime import timedelta
+import pytest
+
+from app import db
+from app.ai import pipeline
+from app.ai.jobs import JOB_QUEUE_KEY, run_job
+from app.models import GratitudeEntry
+from app.helpers.crypto import encrypt_entry
+from app.helpers.summary_cache import summary_cache, month_key
+from app.helpers.timezones import local_today, local_day_bounds_utc
+
+TIMEZONE = "America/New_York"
+
+
+@pytest.fixture
+def quarter(app, make_user, entry_fields):
+    user_id, headers = make_user(TIMEZONE)
+    today = local_today(TIMEZONE)
+    start, _ = pipeline.period_bounds(today, 'quarter')
+
+    def add_entry(day):
+        start_utc, _ = local_day_bounds_utc(TIMEZONE, day)
+        with app.app_context():
+            db.session.add(GratitudeEntry(user_id=user_id, payload=encrypt_entry(entry_fields()),
+                                          local_date=day, timestamp=start_utc + timedelta(hours=12)))
+            db.session.commit()
+
+    for n in range(0, (today - start).days + 1, 2):
+        add_entry(start + timedelta(days=n))
+    return headers, add_entry, start, today, user_id
+
+
+def run_queued_jobs(app):
+    with app.app_context():
+        redis_client = app.extensions['redis']
+        while True:
+            job_id = redis_client.rpop(JOB_QUEUE_KEY)
+            if job_id is None:
+                break
+            run_job(redis_client, job_id.decode())
+
+
+@pytest.fixture
+def built_prompts(monkeypatch):
+    built = []
+    map_prompt = pipeline.map_prompt
+
+    def counting_map_prompt(entries):
+        built.append(len(entries))
+        return map_prompt(entries)
+
+    monkeypatch.setattr(pipeline, 'map_prompt', counting_map_prompt)
+    return built
+
+
+def test_quarter_is_queued_then_served_from_cache(app, client, quarter, gemini):
+    headers = quarter[0]
+
+    queued = client.get("/api/v1/ai/quarterlysummary", headers=headers)
+    assert queued.status_code == 202
+    job_id = queued.get_json()['job_id']
+
+    run_queued_jobs(app)
+    job = client.get(f"/api/v1/ai/monthlysummary/jobs/{job_id}", headers=headers).get_json()
+    assert job['status'] == 'done'
+
+    requests = gemini.requests
+    cached = client.get("/api/v1/ai/quarterlysummary", headers=headers)
+    assert cached.status_code == 200
+    assert cached.get_json()['summary'] == job['result']['summary']
+    assert cached.get_json()['cached'] is True
+    assert gemini.requests == requests
+
+
+def test_only_changed_windows_build_prompts(app, client, quarter, built_prompts):
+    headers, add_entry, start, today, _ = quarter
+    if start + timedelta(days=1) > today:
+        pytest.skip("the quarter started today")
+
+    client.get("/api/v1/ai/quarterlysummary", headers=headers)
+    run_queued_jobs(app)
+    weeks = len(built_prompts)
+    assert weeks >= 1
+
+    add_entry(start + timedelta(days=1))  # joins the first week
+    built_prompts.clear()
+    assert client.get("/api/v1/ai/quarterlysummary", headers=headers).status_code == 202
+    run_queued_jobs(app)
+    assert len(built_prompts) == 1
+
+
+def test_period_without_entries_answers_directly(client, make_user):
+    _, headers = make_user(TIMEZONE)
+    response = client.get("/api/v1/ai/yearlysummary", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['message'] == 'No entries found for this year'
+
+
+def test_jobs_are_deduplicated_per_period(app, client, quarter):
+    headers = quarter[0]
+    month_job = client.post("/api/v1/ai/monthlysummary/jobs?period=month", headers=headers)
+    assert month_job.status_code == 202
+
+    quarter_job = client.get("/api/v1/ai/quarterlysummary", headers=headers)
+    assert quarter_job.status_code == 202
+    assert quarter_job.get_json()['job_id'] != month_job.get_json()['job_id']
+
+    run_queued_jobs(app)
+    result = client.get(f"/api/v1/ai/monthlysummary/jobs/{quarter_job.get_json()['job_id']}",
+                        headers=headers).get_json()['result']
+    assert result['message'] == 'Quarterly summary generated'
+
+
+def test_repeated_request_reports_the_queued_job(client, quarter):
+    headers = quarter[0]
+    first = client.get("/api/v1/ai/yearlysummary", headers=headers)
+    again = client.get("/api/v1/ai/yearlysummary", headers=headers)
+    assert (first.status_code, again.status_code) == (202, 200)
+    assert again.get_json() == {'message': 'Summary job already queued',
+                                'job_id': first.get_json()['job_id']}
+
+
+def test_month_is_reduced_from_cached_weekly_partials(app, client, quarter, gemini, built_prompts):
+    headers, _, _, today, user_id = quarter
+    first = client.get("/api/v1/ai/monthlysummary", headers=headers)
+    assert first.status_code == 200
+    assert first.get_json()['message'] == 'Monthly summary generated'
+    assert built_prompts
+
+    # Only the final reduce runs again once the month's summary is dropped
+    with app.app_context():
+        summary_cache.invalidate(user_id, month_key(today))
+    built_prompts.clear()
+    requests = gemini.requests
+    assert client.get("/api/v1/ai/monthlysummary", headers=headers).status_code == 200
+    assert built_prompts == []
+    assert gemini.requests == requests + 1
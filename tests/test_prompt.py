@@ -0,0 +1,35 @@
+import random
+import pytest
+
+from bench.micro import json_encoding, sample_month
+from app.ai.prompt import encode_entries, estimate_tokens
+
+
+@pytest.mark.parametrize('long_answers', [False, True])
+def test_compact_encoding_uses_fewer_tokens_than_json(long_answers):
+    rows = sample_month(random.Random(19), 31, long_answers)
+
+    baseline = estimate_tokens(json_encoding(rows))
+    compact = estimate_tokens(encode_entries(rows, budget=10 ** 9))
+
+    assert compact < baseline * 0.85, (compact, baseline)
+
+
+def test_budget_drops_entries_evenly_and_deterministically():
+    rows = sample_month(random.Random(19), 31, long_answers=True)
+
+    text = encode_entries(rows, budget=2000)
+
+    assert estimate_tokens(text) <= 2000
+    header, *lines = text.splitlines()
+    shown = [int(line[1:]) for line in lines if line.startswith('#')]
+    assert header == f"({len(shown)} of 31 entries shown, evenly spaced)"
+    assert shown[0] == rows[0][0] and shown[-1] == rows[-1][0]
+    assert encode_entries(rows, budget=2000) == text
+
+
+def test_month_within_budget_is_sent_whole():
+    rows = sample_month(random.Random(19), 30)
+    text = encode_entries(rows, budget=10 ** 9)
+    assert not text.startswith('(')
+    assert text.count('\n#') == len(rows) - 1
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timezone
+import logging
+
+from app import db
+from app.models import GratitudeEntry, User
+from app.helpers.crypto import encrypt_entry
+from app.helpers.unlock_index import unlock_utc_minute
+from app.reminders.scheduler import OffsetTracker, run_tick, tick_key
+from app.reminders.sinks import LogSink
+
+# 2024-03-10 02:00 EST -> 03:00 EDT in New York, at 07:00 UTC
+BEFORE_DST = datetime(2024, 3, 10, 6, 30, tzinfo=timezone.utc)
+AFTER_DST = datetime(2024, 3, 10, 7, 30, tzinfo=timezone.utc)
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def send(self, minute, batch):
+        self.batches.append((minute, batch))
+
+
+def stored_minute(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).unlock_utc_minute
+
+
+def test_settings_change_recomputes_unlock_minute(app, client, make_user):
+    user_id, headers = make_user("Asia/Kolkata")
+
+    def update(**settings):
+        response = client.post("/api/v1/users/settings", headers=headers, json=settings)
+        assert response.status_code == 200
+        return stored_minute(app, user_id)
+
+    assert update(preferred_unlock_time=8) == 8 * 60 - 330
+    assert update(preferred_unlock_time=21) == 21 * 60 - 330
+    assert update(user_timezone="UTC") == 21 * 60
+    assert update(user_timezone="America/New_York") == unlock_utc_minute("America/New_York", 21)
+
+
+def test_dst_transition_reindexes_only_the_shifted_zone(app, make_user, caplog):
+    new_york, _ = make_user("America/New_York", preferred_unlock_time=20)
+    utc, _ = make_user("UTC", preferred_unlock_time=20)
+
+    tracker = OffsetTracker()
+    with app.app_context():
+        tracker.start(BEFORE_DST)
+    assert stored_minute(app, new_york) == 60  # 20:00 EST is 01:00 UTC
+    assert stored_minute(app, utc) == 20 * 60
+
+    with app.app_context():
+        tracker.check(BEFORE_DST.replace(minute=45))
+    assert stored_minute(app, new_york) == 60
+
+    with caplog.at_level(logging.INFO, logger="app.reminders.scheduler"), app.app_context():
+        tracker.check(AFTER_DST)
+    assert stored_minute(app, new_york) == 0  # 20:00 EDT is 00:00 UTC
+    assert stored_minute(app, utc) == 20 * 60
+    assert "Offset change in America/New_York: re-indexed 1 users" in caplog.text
+
+
+def test_tick_sends_users_due_this_minute_without_an_entry(app, make_user, entry_fields):
+    minute = datetime(2024, 6, 1, 0, 0, tzinfo=timezone.utc)  # 20:00 EDT on May 31
+    due, _ = make_user("America/New_York", unlock_utc_minute=0)
+    posted, _ = make_user("America/New_York", unlock_utc_minute=0)
+    make_user("America/New_York", unlock_utc_minute=1)
+    make_user("America/New_York", unlock_utc_minute=0, account_active=False)
+    with app.app_context():
+        db.session.add(GratitudeEntry(user_id=posted, payload=encrypt_entry(entry_fields()),
+                                      local_date=date(2024, 5, 31)))
+        db.session.commit()
+
+    sink = ListSink()
+    with app.app_context():
+        redis_client = app.extensions['redis']
+        assert run_tick(redis_client, sink, minute, batch_size=10) == 1
+        # The minute is claimed, so a second scheduler skips it
+        assert run_tick(redis_client, sink, minute, batch_size=10) is None
+
+    assert sink.batches == [(minute, [{
+        'user_id': due, 'user_timezone': "America/New_York",
+        'unlock_hour': 20, 'local_date': "2024-05-31"}])]
+
+
+def test_reminders_are_sent_once_per_local_date(app, make_user):
+    minute = datetime(2024, 6, 1, 0, 0, tzinfo=timezone.utc)
+    user_ids = [make_user("America/New_York", unlock_utc_minute=0)[0] for _ in range(3)]
+
+    sink = ListSink()
+    with app.app_context():
+        redis_client = app.extensions['redis']
+        assert run_tick(redis_client, sink, minute, batch_size=2) == 3
+        redis_client.delete(tick_key(minute))
+        assert run_tick(redis_client, sink, minute, batch_size=2) == 0
+
+    assert [[r['user_id'] for r in batch] for _, batch in sink.batches] == [user_ids[:2], user_ids[2:]]
+
+
+def test_log_sink_logs_the_batch(caplog):
+    minute = datetime(2024, 6, 1, 0, 0, tzinfo=timezone.utc)
+
+    with caplog.at_level(logging.INFO, logger="app.reminders.sinks"):
+        LogSink().send(minute, [{'user_id': 3}, {'user_id': 9}])
+
+    assert "2024-06-01 00:00 UTC: 2 reminders (users 3..9)" in caplog.text
@@ -0,0 +1,91 @@
+from datetime import date
+import os
+import tempfile
+import time
+import pytest
+
+from app import create_app, db
+from app.config import Config
+from app.helpers import replica
+from app.helpers.crypto import encrypt_entry
+from app.helpers.utils import encode_token
+from app.models import GratitudeEntry, User
+
+
+# A second app whose 'replica' bind is its own SQLite file, so a row only
+# the replica has shows which engine a query went to
+@pytest.fixture
+def routed_app(monkeypatch):
+    path = tempfile.mkdtemp(prefix='gt-replica-')
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', "sqlite:///" + os.path.join(path, 'primary.db'))
+    monkeypatch.setattr(Config, 'SQLALCHEMY_BINDS', {'replica': "sqlite:///" + os.path.join(path, 'replica.db')})
+    monkeypatch.setattr(replica, '_local_pins', {})
+    # init_app registers a metadata per bind key; keep it off the shared app
+    monkeypatch.setattr(db, 'metadatas', dict(db.metadatas))
+    routed = create_app()
+    with routed.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines[replica.REPLICA_BIND])
+        routed.extensions['redis'].flushall()
+    yield routed
+    with routed.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def journal(routed_app, entry_fields):
+    with routed_app.app_context():
+        for engine in (db.engines[None], db.engines[replica.REPLICA_BIND]):
+            with engine.begin() as conn:
+                conn.execute(User.__table__.insert(), {'user_id': 1, 'user_timezone': 'UTC'})
+        with db.engines[replica.REPLICA_BIND].begin() as conn:
+            conn.execute(GratitudeEntry.__table__.insert(), {
+                'user_id': 1, 'payload': encrypt_entry(entry_fields(entry1='Only on the replica')),
+                'local_date': date(2020, 1, 1)})
+    return {'Authorization': f"Bearer {encode_token(1)}"}
+
+
+def listed(client, headers):
+    response = client.get("/api/v1/entries", headers=headers)
+    assert response.status_code == 200
+    return [entry['entry1'] for entry in response.get_json()['data']]
+
+
+def test_reads_use_replica_until_a_write_pins_the_primary(routed_app, journal, entry_fields):
+    client = routed_app.test_client()
+
+    assert listed(client, journal) == ['Only on the replica']
+
+    assert client.post("/api/v1/entries", headers=journal, json=entry_fields()).status_code == 201
+    with routed_app.app_context():
+        assert db.session.query(GratitudeEntry).count() == 1
+        with db.engines[replica.REPLICA_BIND].connect() as conn:
+            assert conn.execute(GratitudeEntry.__table__.select()).all()[0].local_date == date(2020, 1, 1)
+
+    # bump_data_version pinned the user, so the read skips the stale replica
+    assert listed(client, journal) == ['Morning coffee']
+
+
+def test_pin_expiry_returns_reads_to_replica(routed_app, journal, entry_fields):
+    client = routed_app.test_client()
+
+    client.post("/api/v1/entries", headers=journal, json=entry_fields())
+    assert listed(client, journal) == ['Morning coffee']
+
+    with routed_app.app_context():
+        routed_app.extensions['redis'].delete(replica.pin_key(1))
+    replica._local_pins[1] = time.time() - 1
+    assert listed(client, journal) == ['Only on the replica']
+    assert 1 not in replica._local_pins
+
+
+def test_expired_local_pins_are_swept(routed_app, monkeypatch):
+    monkeypatch.setattr(replica, 'LOCAL_PIN_SWEEP', 3)
+    replica._local_pins.update({10: time.time() - 1, 11: time.time() - 1, 12: time.time() + 60})
+
+    with routed_app.app_context():
+        replica.pin_to_primary(13)
+
+    assert sorted(replica._local_pins) == [12, 13]
@@ -0,0 +1,49 @@
+import pytest
+
+from app.helpers.search import MAX_QUERY_WORDS
+
+
+@pytest.fixture
+def journal(client, make_user, entry_fields):
+    _, headers = make_user()
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields(
+        entry1="Coffee with friends in Lisbon")).status_code == 201
+    return headers
+
+
+def search(client, headers, q):
+    return client.get("/api/v1/entries/search", headers=headers, query_string={'q': q})
+
+
+def test_every_word_must_match(client, journal):
+    found = search(client, journal, "Friend lisbon coffee")
+    assert found.status_code == 200
+    assert [e['entry1'] for e in found.get_json()['data']] == ["Coffee with friends in Lisbon"]
+
+    assert search(client, journal, "coffee kyoto").get_json()['data'] == []
+
+
+def test_query_without_searchable_words(client, journal):
+    response = search(client, journal, "the and of")
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Search must contain at least one word'
+
+
+# Extra words used to be dropped silently, which could return entries that
+# do not contain all of them
+def test_query_with_too_many_words(client, journal):
+    words = "coffee friend lisbon walk home photo trip smile morning".split()
+    assert len(words) == MAX_QUERY_WORDS + 1
+
+    response = search(client, journal, " ".join(words))
+    assert response.status_code == 400
+    assert response.get_json()['message'] == f'Search must contain at most {MAX_QUERY_WORDS} words'
+
+    assert search(client, journal, " ".join(words[:MAX_QUERY_WORDS])).status_code == 200
+
+
+def test_limit_must_be_positive(client, journal):
+    response = client.get("/api/v1/entries/search", headers=journal,
+                          query_string={'q': "coffee", 'limit': 0})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'limit must be positive'
@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+import random
+import pytest
+
+from app import db
+from app.models import GratitudeEntry
+from app.helpers.stats import (
+    STAT_FIELDS, apply_added_day, apply_removed_day, calendar_days, compute_stats,
+    get_stats_row, stats_values)
+from app.helpers.timezones import local_today
+
+TIMEZONE = "America/New_York"
+
+
+@pytest.fixture
+def journal(app, client, make_user, entry_fields):
+    user_id, headers = make_user(TIMEZONE)
+    today = local_today(TIMEZONE)
+
+    def sync(*days_ago):
+        response = client.post("/api/v1/entries/sync", headers=headers, json={'entries': [
+            entry_fields(idempotency_key=f"key-{n}",
+                         local_date=(today - timedelta(days=n)).isoformat())
+            for n in days_ago]})
+        assert response.status_code == 200
+        assert {item['status'] for item in response.get_json()['data']} == {'created'}
+
+    def submit():
+        response = client.post("/api/v1/entries", headers=headers, json=entry_fields())
+        assert response.status_code == 201
+        return response.get_json()['data']['id']
+
+    def delete(entry_id):
+        assert client.delete(f"/api/v1/entries/{entry_id}", headers=headers).status_code == 200
+
+    # The stored row must equal a full recomputation from the entries themselves
+    # and from the calendar the row was derived from
+    def check():
+        with app.app_context():
+            days = sorted(day for (day,) in db.session.query(GratitudeEntry.local_date).filter_by(
+                user_id=user_id))
+            expected = compute_stats(days)
+            assert stats_values(get_stats_row(user_id)) == expected
+            assert compute_stats(calendar_days(user_id)) == expected
+
+    return SimpleNamespace(sync=sync, submit=submit, delete=delete, check=check, headers=headers)
+
+
+# Random add/back-date/remove-last histories: after every step the
+# incrementally updated row must equal a full recompute. When an apply_*
+# helper declines (returns False) the caller recomputes, as the routes do.
+def test_incremental_updates_match_full_recompute():
+    rng = random.Random(24)
+    for _ in range(200):
+        days = set()
+        stats = SimpleNamespace(**compute_stats([]))
+        today = date(2024, 1, 1)
+        for _ in range(rng.randint(1, 120)):
+            op = rng.random()
+            if op < 0.7:
+                today += timedelta(days=rng.choice((1, 1, 1, 2, 5)))
+                day = today
+            elif op < 0.85:
+                day = today - timedelta(days=rng.randint(1, 60))
+            else:
+                day = max(days) if days else None
+
+            if day is None or (op < 0.85 and day in days):
+                continue
+            if op < 0.85:
+                days.add(day)
+                applied = apply_added_day(stats, day)
+            else:
+                days.discard(day)
+                applied = apply_removed_day(stats, day)
+            if not applied:
+                stats.__dict__.update(compute_stats(sorted(days)))
+
+            expected = compute_stats(sorted(days))
+            assert {field: getattr(stats, field) for field in STAT_FIELDS} == expected, sorted(days)
+
+
+def test_stats_follow_submit_sync_and_delete(journal):
+    journal.sync(20, 19, 18)  # creates the row
+    journal.check()
+    journal.sync(15, 14)  # appended after the last day
+    journal.check()
+    journal.sync(25, 24, 23, 22)  # back-dated, longest streak moves earlier
+    journal.check()
+
+    entry_id = journal.submit()
+    journal.check()
+    journal.delete(entry_id)  # today alone, not part of a streak
+    journal.check()
+
+    journal.sync(1, 2, 3)
+    journal.check()
+    entry_id = journal.submit()  # extends the current streak to four days
+    journal.check()
+    journal.delete(entry_id)  # drops the last day of a streak
+    journal.check()
+    entry_id = journal.submit()
+    journal.check()
+    journal.sync(4, 5, 6, 7)  # joins two streaks into the longest one
+    journal.check()
+    journal.delete(entry_id)  # removing the longest streak's last day recomputes
+    journal.check()
+
+
+def test_stats_endpoint_reports_the_row(client, journal):
+    journal.sync(5, 3, 2, 1)
+    journal.submit()
+    journal.check()
+
+    data = client.get("/api/v1/users/stats", headers=journal.headers).get_json()['data']
+    assert (data['current_streak'], data['longest_streak'], data['total_days']) == (4, 4, 5)
+
+
+def test_backfill_missing_only_builds_absent_rows(app, journal, make_user):
+    journal.sync(3, 2, 1)
+    other_id, _ = make_user(TIMEZONE)
+
+    result = app.test_cli_runner().invoke(args=['backfill-stats', '--missing'])
+    assert "Rebuilt stats for 1 users" in result.output
+    with app.app_context():
+        assert stats_values(get_stats_row(other_id)) == compute_stats([])
+    journal.check()
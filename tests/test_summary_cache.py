@@ -0,0 +1,104 @@
+from datetime import timedelta
+from types import SimpleNamespace
+import pytest
+
+from app.helpers import summary_cache as cache_module
+from app.helpers.summary_cache import summary_cache, month_key
+from app.helpers.timezones import local_today
+
+TIMEZONE = "America/New_York"
+
+
+@pytest.fixture
+def journal(app, client, make_user, entry_fields, gemini):
+    user_id, headers = make_user(TIMEZONE)
+    today = local_today(TIMEZONE)
+
+    def summarize():
+        before = gemini.requests
+        response = client.get("/api/v1/ai/monthlysummary", headers=headers)
+        assert response.status_code == 200
+        return response.get_json(), gemini.requests - before
+
+    def is_cached(day=today):
+        with app.app_context():
+            return bool(app.extensions['redis'].exists(summary_cache._key(user_id, month_key(day))))
+
+    def sync(day):
+        response = client.post("/api/v1/entries/sync", headers=headers, json={'entries': [
+            entry_fields(idempotency_key=f"key-{day}", local_date=day.isoformat())]})
+        assert response.status_code == 200
+
+    def submit():
+        response = client.post("/api/v1/entries", headers=headers, json=entry_fields())
+        assert response.status_code == 201
+        return response.get_json()['data']['id']
+
+    return SimpleNamespace(headers=headers, today=today, summarize=summarize,
+                           is_cached=is_cached, sync=sync, submit=submit)
+
+
+def test_second_request_is_a_hit(app, journal):
+    journal.submit()
+
+    first, calls = journal.summarize()
+    assert 'cached' not in first
+    assert calls > 0
+    assert journal.is_cached()
+
+    second, calls = journal.summarize()
+    assert second['cached'] is True
+    assert second['summary'] == first['summary']
+    assert calls == 0
+    with app.app_context():
+        assert summary_cache.stats() == {'hits': 1, 'misses': 1}
+
+
+def test_delete_invalidates_the_month(client, journal):
+    entry_id = journal.submit()
+    journal.summarize()
+
+    assert client.delete(f"/api/v1/entries/{entry_id}", headers=journal.headers).status_code == 200
+    assert not journal.is_cached()
+
+
+def test_submit_invalidates_the_month(journal):
+    if journal.today.day == 1:
+        pytest.skip("no earlier day in this month")
+    journal.sync(journal.today - timedelta(days=1))
+    journal.summarize()
+
+    journal.submit()
+    assert not journal.is_cached()
+
+
+def test_sync_invalidates_only_the_months_it_touches(journal):
+    journal.submit()
+    journal.summarize()
+
+    journal.sync(journal.today.replace(day=1) - timedelta(days=1))  # last month
+    assert journal.is_cached()
+
+    if journal.today.day > 1:
+        journal.sync(journal.today - timedelta(days=1))
+        assert not journal.is_cached()
+
+
+# Without Redis the cache falls back to a bounded in-process LRU
+def test_local_cache_without_redis(app, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'redis', None)
+    monkeypatch.setattr(summary_cache, '_local', type(summary_cache._local)())
+    monkeypatch.setattr(cache_module, 'LOCAL_CACHE_SIZE', 2)
+
+    with app.app_context():
+        summary_cache.set(1, '2024-05', 'digest-a', "May")
+        assert summary_cache.get(1, '2024-05', 'digest-a') == "May"
+        assert summary_cache.get(1, '2024-05', 'digest-b') is None
+
+        summary_cache.invalidate(1, '2024-05')
+        assert summary_cache.get(1, '2024-05', 'digest-a') is None
+
+        for month in ('2024-06', '2024-07', '2024-08'):
+            summary_cache.set(1, month, 'digest', month)
+        assert summary_cache.get(1, '2024-06', 'digest') is None
+        assert summary_cache.get(1, '2024-08', 'digest') == '2024-08'
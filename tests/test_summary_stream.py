@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+import json
+import pytest
+
+from app.ai.summary import MODERATION_PREFIX
+from app.helpers.summary_cache import summary_cache, month_key
+from app.helpers.timezones import local_now
+
+MODERATION_MESSAGE = (f"{MODERATION_PREFIX} violating the AI's guidelines. Offending entry id: 1. "
+                      "Please contact support@gratefultime.app for assistance.")
+
+
+@pytest.fixture
+def journal(client, make_user, entry_fields):
+    user_id, headers = make_user()
+    assert client.post("/api/v1/entries", headers=headers, json=entry_fields()).status_code == 201
+    return SimpleNamespace(user_id=user_id, headers=headers)
+
+
+def stream(client, headers):
+    response = client.get("/api/v1/ai/monthlysummary/stream", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    response.close()
+    return events
+
+
+def test_relays_chunks_then_serves_the_cached_summary(client, journal, gemini):
+    requests = gemini.requests
+    events = stream(client, journal.headers)
+    assert events == [('chunk', {'text': f"Chunk {i}. "}) for i in range(gemini.chunks)] + [
+        ('done', {'message': 'Monthly summary generated'})]
+    assert gemini.requests == requests + 2  # the week's partial, then the streamed reduce
+
+    summary = "".join(f"Chunk {i}. " for i in range(gemini.chunks))
+    assert stream(client, journal.headers) == [
+        ('chunk', {'text': summary}),
+        ('done', {'message': 'Monthly summary generated', 'cached': True})]
+    assert gemini.requests == requests + 2
+
+
+def test_error_event_after_the_stream_started(client, journal, gemini, monkeypatch, caplog):
+    monkeypatch.setattr(gemini, 'cut_after', 2)
+    events = stream(client, journal.headers)
+    assert events == [('chunk', {'text': "Chunk 0. "}), ('chunk', {'text': "Chunk 1. "}),
+                      ('error', {'message': 'Failed to contact AI service', 'status_code': 503})]
+    assert [(r.name, r.levelname) for r in caplog.records if 'Gemini' in r.getMessage()] == [
+        ('app.ai.summary', 'WARNING')]
+
+    # Nothing partial was cached, so the next request streams again
+    monkeypatch.setattr(gemini, 'cut_after', None)
+    requests = gemini.requests
+    assert stream(client, journal.headers)[-1] == ('done', {'message': 'Monthly summary generated'})
+    assert gemini.requests == requests + 1
+
+
+# The weekly partial is cached by a first run, so only the streamed request fails
+def test_error_before_the_stream_keeps_the_json_response(app, client, journal, gemini, monkeypatch, caplog):
+    stream(client, journal.headers)
+    with app.app_context():
+        summary_cache.invalidate(journal.user_id, month_key(local_now("America/New_York")))
+    monkeypatch.setattr(gemini, 'error_rate', 1.0)
+    response = client.get("/api/v1/ai/monthlysummary/stream", headers=journal.headers)
+    assert response.status_code == 503
+    assert response.get_json()['message'] == 'Failed to contact AI service'
+    assert [(r.name, r.levelname) for r in caplog.records if 'Gemini' in r.getMessage()] == [
+        ('app.ai.routes', 'WARNING')]
+
+
+def test_relays_the_moderation_message(client, journal, gemini, monkeypatch):
+    words = MODERATION_MESSAGE.split(" ")
+    monkeypatch.setattr(gemini, 'stream_texts', [" ".join(words[:6]) + " ", " ".join(words[6:])])
+    events = stream(client, journal.headers)
+
+    assert [event for event, _ in events] == ['chunk', 'chunk', 'done']
+    assert "".join(data['text'] for event, data in events if event == 'chunk') == MODERATION_MESSAGE
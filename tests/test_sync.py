@@ -0,0 +1,75 @@
+from datetime import timedelta
+import pytest
+
+from app.config import Config
+from app.helpers.timezones import local_today
+
+TIMEZONE = "America/New_York"
+
+
+@pytest.fixture
+def sync(client, make_user, entry_fields):
+    _, headers = make_user(TIMEZONE)
+    today = local_today(TIMEZONE)
+
+    def item(key, days_ago, **overrides):
+        return entry_fields(idempotency_key=key, local_date=(today - timedelta(days=days_ago)).isoformat(),
+                            **overrides)
+
+    def post(*items, body=None):
+        return client.post("/api/v1/entries/sync", headers=headers,
+                           json={'entries': list(items)} if body is None else body)
+
+    post.item = item
+    post.headers = headers
+    return post
+
+
+def statuses(response):
+    assert response.status_code == 200
+    return [result['status'] for result in response.get_json()['data']]
+
+
+def test_created_then_duplicate(client, sync):
+    first = sync(sync.item("a", 2), sync.item("b", 1))
+    assert statuses(first) == ['created', 'created']
+
+    again = sync(sync.item("a", 2), sync.item("c", 0))
+    assert statuses(again) == ['duplicate', 'created']
+    assert again.get_json()['data'][0]['id'] == first.get_json()['data'][0]['id']
+
+    entries = client.get("/api/v1/entries?limit=10", headers=sync.headers).get_json()['data']
+    assert len(entries) == 3
+
+
+def test_conflicts_with_existing_day_and_within_batch(client, sync, entry_fields):
+    assert client.post("/api/v1/entries", headers=sync.headers, json=entry_fields()).status_code == 201
+
+    response = sync(sync.item("today", 0), sync.item("x", 3), sync.item("y", 3))
+    assert statuses(response) == ['conflict', 'created', 'conflict']
+    assert response.get_json()['data'][0]['message'] == 'Already submitted for this day'
+
+
+def test_invalid_items_are_reported_individually(sync):
+    response = sync(
+        sync.item("ok", 1),
+        sync.item("ok", 2),  # repeated key
+        sync.item("short", 3, entry1="hi"),
+        sync.item("old", Config.SYNC_MAX_AGE_DAYS + 1),
+        sync.item("future", -1),
+        dict(sync.item("bad-date", 4), local_date="yesterday"),
+        "not an object",
+    )
+    assert statuses(response) == ['created'] + ['invalid'] * 6
+    assert response.get_json()['data'][2]['errorCode'] == 'entry1'
+
+
+@pytest.mark.parametrize('body', [[1], "entries", 3, None, {'entries': []}, {'entries': {}}])
+def test_malformed_body(sync, body):
+    response = sync(body=body)
+    assert response.status_code == 400
+
+
+def test_batch_size_limit(sync):
+    response = sync(*[sync.item(f"k{n}", n) for n in range(Config.SYNC_MAX_BATCH + 1)])
+    assert response.status_code == 400
@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta, timezone
+import pytest
+
+from app.helpers.timezones import (local_day_bounds_utc, local_month_bounds_utc, to_local,
+                                   is_valid_timezone)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+# (zone, local day, hours in that day). Santiago changes at local midnight,
+# so 2024-09-08 starts at 01:00 and 2024-04-06 ends with a repeated hour.
+TRANSITION_DAYS = [
+    ("America/New_York", date(2024, 3, 10), 23),
+    ("America/New_York", date(2024, 11, 3), 25),
+    ("America/Los_Angeles", date(2024, 3, 10), 23),
+    ("Europe/London", date(2024, 3, 31), 23),
+    ("Europe/London", date(2024, 10, 27), 25),
+    ("Europe/Berlin", date(2024, 3, 31), 23),
+    ("Europe/Berlin", date(2024, 10, 27), 25),
+    ("America/Santiago", date(2024, 9, 8), 23),
+    ("America/Santiago", date(2024, 4, 6), 25),
+    ("Asia/Kolkata", date(2024, 3, 31), 24),
+]
+
+
+@pytest.mark.parametrize('name, day, hours', TRANSITION_DAYS)
+def test_day_length_across_transitions(name, day, hours):
+    start, end = local_day_bounds_utc(name, day)
+    assert end - start == timedelta(hours=hours)
+    assert to_local(start, name).date() == day
+    assert to_local(end - timedelta(microseconds=1), name).date() == day
+
+
+@pytest.mark.parametrize('name, day, hours', TRANSITION_DAYS)
+def test_days_around_transitions_are_contiguous(name, day, hours):
+    days = [day + timedelta(days=n) for n in range(-2, 3)]
+    bounds = [local_day_bounds_utc(name, d) for d in days]
+    for (_, end), (start, _) in zip(bounds, bounds[1:]):
+        assert end == start
+
+
+@pytest.mark.parametrize('name, year, month, start, end', [
+    ("America/New_York", 2024, 3, utc(2024, 3, 1, 5), utc(2024, 4, 1, 4)),
+    ("America/New_York", 2024, 11, utc(2024, 11, 1, 4), utc(2024, 12, 1, 5)),
+    ("Europe/London", 2024, 3, utc(2024, 3, 1), utc(2024, 3, 31, 23)),
+    ("Europe/Berlin", 2024, 10, utc(2024, 9, 30, 22), utc(2024, 10, 31, 23)),
+    ("Europe/Berlin", 2024, 12, utc(2024, 11, 30, 23), utc(2024, 12, 31, 23)),
+    ("America/Santiago", 2024, 9, utc(2024, 9, 1, 4), utc(2024, 10, 1, 3)),
+    ("America/Santiago", 2024, 4, utc(2024, 4, 1, 3), utc(2024, 5, 1, 4)),
+])
+def test_month_bounds(name, year, month, start, end):
+    assert local_month_bounds_utc(name, year, month) == (start, end)
+
+    last_day = (date(year, month, 28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    assert local_day_bounds_utc(name, date(year, month, 1))[0] == start
+    assert local_day_bounds_utc(name, last_day)[1] == end
+
+
+def test_invalid_timezone():
+    assert is_valid_timezone("Europe/Berlin")
+    assert not is_valid_timezone("Mars/Olympus_Mons")
+    with pytest.raises(ValueError):
+        local_day_bounds_utc("Mars/Olympus_Mons", date(2024, 1, 1))